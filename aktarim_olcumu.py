@@ -0,0 +1,247 @@
+"""
+Aktarım ölçümü: sınıf listesi içe aktarma hattının aşama aşama süreleri
+Yüzlerce SınıfListesi[KOD].xls benzeri dosya ile kapasite ve "Derslik Yakınlık"
+dosyalarını sentetik olarak üretir (ya da --source ile mevcut bir klasörü kullanır),
+ayrıştırma + veritabanı aktarımını uçtan uca geçici bir SQLite veritabanında çalıştırır.
+Aşamalar: dosya okuma, satır ayrıştırma, birleştirme, şifre hash'leme, veritabanı yazma
+(ve kapasite/yakınlık dosyaları). Her aşama için süre, satır/sn ve tepe bellek (RSS)
+raporlanır; --profile verilirse her aşamanın cProfile çıktısı ayrı dosyaya yazılır.
+Ölçümden sonra eşitlemeli (sync) ikinci aktarım doğrulanır: derslerin bir kısmı listeden
+çıkarılır, birinden bir öğrenci silinir; sonuç 'sync' altında raporlanır.
+
+Not: xls yazıcısı (xlwt) gerektirmemek için sentetik listeler xlsx içerikli kaydedilir,
+pandas içeriğe bakarak okur. Dosya düzeni (başlık bloğu, #/Bölüm/Öğrenci no/Adı Soyadı
+sütunları) gerçek listelerle aynıdır.
+
+Kullanım: python aktarim_olcumu.py [--files 300] [--per-file 120] [--rooms 80] [--profile profil/] [--out aktarim_olcumu.json]
+"""
+import argparse
+import contextlib
+import cProfile
+import io
+import json
+import os
+import random
+import resource
+import tempfile
+import time
+from pathlib import Path
+from openpyxl import Workbook
+
+ONEKLER = ['BLM', 'YZM', 'MAT', 'FIZ', 'KIM', 'ELK', 'MAK', 'END', 'SEC']
+ACIKLAMALAR = [None, None, None, '1. Tekrar. Devam almış', '2. Tekrar. Devam almış']
+
+def _save_rows(path, rows):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+
+def generate_files(folder, files, per_file, rooms, seed=0):
+    """Sentetik sınıf listeleri (~%10'u aynı dersin ikinci şubesi), kapasite ve yakınlık dosyaları"""
+    rng = random.Random(seed)
+    folder = Path(folder)
+    n_codes = max(1, int(files * 0.9))
+    codes = [f'{ONEKLER[i % len(ONEKLER)]}{100 + i // len(ONEKLER):03d}' for i in range(n_codes)]
+    pool = max(per_file * 6, files * per_file // 5) # Öğrenciler birden çok derste
+    for i in range(files):
+        code = codes[i % n_codes]
+        section = i // n_codes
+        name = f'SınıfListesi[{code}].xls' if section == 0 else f'SınıfListesi[{code}] ({section}).xls'
+        rows = [[None, None, None, f'Sentetik Üniversite\n\n{code} SENTETİK DERS\nSınıf Listesi', None, None, None, None, '17.12.2025'],
+                [], [], [],
+                ['#', 'Bölüm', None, None, 'Öğrenci no', 'Adı Soyadı', 'Açıklama']]
+        for n, s in enumerate(sorted(rng.sample(range(pool), min(per_file, pool))), 1):
+            rows.append([n, 'SENTETİK BÖLÜM', None, None, 220000000 + s, f'OGRENCI {s} SOYAD{s % 97}', rng.choice(ACIKLAMALAR)])
+        _save_rows(folder / name, rows)
+
+    # Derslikler bloklar halinde; yakın derslikler aynı bloktan
+    blocks = {}
+    for r in range(rooms):
+        blocks.setdefault(chr(ord('A') + r // 8 % 26), []).append(f'{chr(ord("A") + r // 8 % 26)}{101 + r}')
+    _save_rows(folder / 'sentetik_sinav_kapasiteleri.xlsx',
+               [['Sınıf', 'Kontenjan']] + [[room, rng.choice([30, 44, 56, 80, 120])] for b in blocks.values() for room in b])
+    _save_rows(folder / 'Derslik Yakınlık.xlsx',
+               [['BLOK', 'DERSLİK', 'YAKIN DERSLİK']] +
+               [[block, room, ','.join(r for r in members if r != room)] for block, members in blocks.items() for room in members])
+    return {'files': files, 'courses': n_codes, 'student_pool': pool, 'roster_rows': files * min(per_file, pool), 'rooms': rooms}
+
+def _rss_mb():
+    # Linux'ta ru_maxrss KB cinsindendir
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+@contextlib.contextmanager
+def stage(stats, name, profiles=None):
+    """Aşama süresini biriktirir (aynı aşama dosya başına defalarca girilebilir), istenirse profiller"""
+    prof = profiles.setdefault(name, cProfile.Profile()) if profiles is not None else None
+    entry = stats.setdefault(name, {'seconds': 0.0, 'calls': 0})
+    if prof: prof.enable()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        entry['seconds'] += time.perf_counter() - start
+        entry['calls'] += 1
+        if prof: prof.disable()
+        entry['peak_rss_mb'] = _rss_mb()
+
+def run_pipeline(folder, profiles=None, verbose=False):
+    """import_all_data + import_roster_data ile aynı adımlar (tek işçi, önbelleksiz), aşama aşama ölçülür"""
+    from ana import ensure_defaults
+    from excel_ayiklayici import (roster_files, course_code_from_filename, course_name, _read_table,
+                                  parse_student_frame, merge_student_list, parse_capacities, parse_proximity_list)
+    from veri_aktarimi import import_roster_data, _default_hash
+
+    stats = {}
+    all_students = {}
+    folder = Path(folder)
+    quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    start = time.perf_counter()
+    with quiet:
+        with stage(stats, 'kapasite_yakinlik', profiles):
+            cap_files = list(folder.glob('*kapasite*'))
+            capacities = parse_capacities(str(cap_files[0])) if cap_files else {}
+            prox_files = list(folder.glob('*Yakınlık*'))
+            proximity, rooms = parse_proximity_list(str(prox_files[0])) if prox_files else ([], set())
+
+        parsed_rows = 0
+        for f in roster_files(folder):
+            code = course_code_from_filename(f)
+            with stage(stats, 'dosya_okuma', profiles):
+                df = _read_table(f)
+            with stage(stats, 'satir_ayristirma', profiles):
+                st = parse_student_frame(df, code)
+            parsed_rows += len(st)
+            with stage(stats, 'birlestirme', profiles):
+                merge_student_list(all_students, st, code, course_name(code))
+        for data in all_students.values():
+            data.pop('ids', None)
+
+        # Varsayılan şifre aktarım başına bir kez hash'lenir; önbelleği boşaltıp ayrıca ölç
+        _default_hash.cache_clear()
+        with stage(stats, 'sifre_hash', profiles):
+            _default_hash()
+        dept_id = ensure_defaults()
+        with stage(stats, 'veritabani_yazma', profiles):
+            report = import_roster_data(all_students, proximity, rooms, capacities, dept_id)
+    total = time.perf_counter() - start
+    with quiet:
+        sync = check_sync(all_students, proximity, rooms, capacities, dept_id)
+
+    merged_rows = sum(len(d['students']) for d in all_students.values())
+    rows_by_stage = {'dosya_okuma': parsed_rows, 'satir_ayristirma': parsed_rows, 'birlestirme': parsed_rows,
+                     'veritabani_yazma': report['rows']}
+    for name, entry in stats.items():
+        entry['seconds'] = round(entry['seconds'], 4)
+        if name in rows_by_stage:
+            entry['rows'] = rows_by_stage[name]
+            entry['rows_per_sec'] = int(rows_by_stage[name] / entry['seconds']) if entry['seconds'] else None
+    return {
+        'stages': stats,
+        'total_seconds': round(total, 3),
+        'parsed_rows': parsed_rows,
+        'merged_rows': merged_rows,
+        'courses': len(all_students),
+        'rows_per_sec': int(parsed_rows / total) if total else None,
+        'db': {k: report[k] for k in ('inserted', 'updated', 'rows', 'seconds', 'rows_per_sec')},
+        'sync': sync,
+        'peak_rss_mb': _rss_mb(),
+    }
+
+def check_sync(all_students, proximity, rooms, capacities, dept_id, drop_ratio=0.1):
+    """
+    Eşitlemeli ikinci aktarım: derslerin drop_ratio kadarı listeden çıkarılır (biri öğrencisiz bırakılır),
+    kalan bir dersten bir öğrenci silinir. Çıkarılan derslerin kaydı kalmamalı ve 'dropped_courses' ile
+    raporlanmalı, öğrenci sayıları kayıt tablosuyla aynı olmalı; sapmalar 'errors' altında döner.
+    """
+    from sqlalchemy import func
+    from modeller import db, Course, CourseStudent
+    from veri_aktarimi import import_roster_data
+
+    codes = sorted(all_students)
+    dropped = set(codes[::max(1, int(1 / drop_ratio))])
+    students = {code: dict(data) for code, data in all_students.items() if code not in dropped}
+    emptied = next(iter(sorted(dropped)), None)
+    if emptied:
+        students[emptied] = dict(all_students[emptied], students=[]) # listesi boş gelen ders de çıkmış sayılır
+    trimmed = next(code for code in sorted(students) if students[code]['students'])
+    students[trimmed] = dict(students[trimmed], students=students[trimmed]['students'][1:])
+
+    report = import_roster_data(students, proximity, rooms, capacities, dept_id, sync=True)
+    enrolled = dict(db.session.query(Course.code, func.count(CourseStudent.id))
+                    .join(CourseStudent, CourseStudent.course_id == Course.id).group_by(Course.code))
+    counts = dict(db.session.query(Course.code, Course.student_count))
+    errors = []
+    if set(report['dropped_courses']) != dropped:
+        errors.append(f"dropped_courses {len(report['dropped_courses'])} != {len(dropped)}")
+    errors += [f'{code}: {enrolled[code]} kayıt kaldı' for code in sorted(dropped) if enrolled.get(code)]
+    if report['diff'].get(trimmed) != {'added': 0, 'removed': 1}:
+        errors.append(f"{trimmed}: fark {report['diff'].get(trimmed)}")
+    errors += [f'{code}: student_count {counts[code]} != {enrolled.get(code, 0)}'
+               for code in sorted(counts) if (counts[code] or 0) != enrolled.get(code, 0)]
+    return {'dropped_courses': len(report['dropped_courses']), 'deleted': report['deleted']['course_students'],
+            'seconds': report['seconds'], 'errors': errors}
+
+def main():
+    parser = argparse.ArgumentParser(description='İçe aktarma hattının aşama aşama ölçümü')
+    parser.add_argument('--files', type=int, default=300, help='sentetik sınıf listesi sayısı')
+    parser.add_argument('--per-file', type=int, default=120, help='liste başına öğrenci')
+    parser.add_argument('--rooms', type=int, default=80)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--source', help='sentetik üretim yerine bu klasördeki dosyaları kullan (örn. data)')
+    parser.add_argument('--profile', help='her aşamanın cProfile çıktısının yazılacağı klasör (<aşama>.prof); süreler profil yüküyle artar')
+    parser.add_argument('--verbose', action='store_true', help='aktarımın kendi çıktılarını gizleme')
+    parser.add_argument('--out', default='aktarim_olcumu.json')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Uygulama geçici veritabanıyla açılsın (ana içe aktarılmadan önce)
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'aktarim.db')}"
+        from ana import app
+        from veritabani_gocleri import migrate
+
+        folder, generated = args.source, None
+        if not folder:
+            folder = os.path.join(tmp, 'data')
+            os.makedirs(folder)
+            t0 = time.perf_counter()
+            generated = generate_files(folder, args.files, args.per_file, args.rooms, args.seed)
+            generated['seconds'] = round(time.perf_counter() - t0, 2)
+            print(f"🧪 {generated['files']} liste ({generated['roster_rows']} satır), {generated['rooms']} derslik üretildi "
+                  f"({generated['seconds']} sn)")
+
+        profiles = {} if args.profile else None
+        with app.app_context():
+            with contextlib.redirect_stdout(io.StringIO()):
+                migrate()
+            result = run_pipeline(folder, profiles, args.verbose)
+            from modeller import db
+            db.session.remove()
+            db.engine.dispose()
+
+    print(f"\n{'aşama':<20}{'süre sn':>10}{'çağrı':>8}{'satır/sn':>12}{'RSS MB':>9}")
+    for name, entry in result['stages'].items():
+        print(f"{name:<20}{entry['seconds']:>10.3f}{entry['calls']:>8}{entry.get('rows_per_sec') or '-':>12}{entry['peak_rss_mb']:>9}")
+    print(f"\n⏱ Toplam {result['total_seconds']} sn | {result['parsed_rows']} satır ({result['rows_per_sec']} satır/sn) | "
+          f"{result['courses']} ders | veritabanı {result['db']['rows']} satır | tepe RSS {result['peak_rss_mb']} MB")
+    sync = result['sync']
+    if sync['errors']:
+        print(f"❌ Eşitlemeli aktarım doğrulaması: {sync['errors'][:10]}")
+    else:
+        print(f"✅ Eşitlemeli aktarım: {sync['dropped_courses']} ders listeden çıktı, {sync['deleted']} kayıt silindi "
+              f"({sync['seconds']} sn)")
+
+    if profiles:
+        os.makedirs(args.profile, exist_ok=True)
+        for name, prof in profiles.items():
+            prof.dump_stats(os.path.join(args.profile, f'{name}.prof'))
+        print(f"📈 Profiller: {args.profile}/<aşama>.prof (python -m pstats ile açılır)")
+
+    with open(args.out, 'w', encoding='utf-8') as fh:
+        json.dump({'params': {k: v for k, v in vars(args).items() if k != 'out'}, 'generated': generated, 'result': result},
+                  fh, ensure_ascii=False, indent=2)
+    print(f"💾 Sonuç: {args.out}")
+
+if __name__ == '__main__':
+    main()
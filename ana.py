@@ -1,27 +1,43 @@
 """
 Flask ana uygulama dosyası - Otomatik Ders ve Bölüm Oluşturma Eklendi
 """
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, session, abort
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from modeller import db, User, Faculty, Department, Course, CourseStudent, Classroom, ClassroomProximity, ExamSchedule, InstructorAvailability
-from datetime import datetime, time, date, timedelta
+from modeller import db, User, Faculty, Department, Course, CourseStudent, Classroom, ClassroomProximity, ExamSchedule, InstructorAvailability, PlanningJob
+from datetime import datetime, time, date, timedelta, timezone
 import os
 import json
-import unidecode
+import zlib
+import click
 
 # Excel modülünü çağırıyoruz
 from excel_ayiklayici import import_all_data
+from veri_aktarimi import import_roster_data
+from program_onbellegi import schedule_version, grouped_program, student_timetable
+from veritabani_gocleri import migrate
+from sinav_takvimi import replace_periods
+from veritabani_ayarlari import database_config
+import olcumleme
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'gizli-anahtar-uretimde-degistirin'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///sinav_programi.db'
+# Veritabanı adresi ve havuz ayarları ortamdan (DATABASE_URL, DB_POOL_SIZE...) okunur
+app.config.update(database_config())
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db.init_app(app)
+# İstek süresi / SQL sayısı ölçümü (METRICS_ENABLED=0 ile kapanır)
+olcumleme.init_app(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
+@app.before_request
+def start_planning_worker():
+    # Geliştirme sunucusunda işçi göçlerden sonra kalkar; gunicorn vb. ile ilk istekte bir kez denenir
+    from planlama_isleri import start_worker_on_boot
+    start_worker_on_boot(app)
+
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
@@ -116,13 +132,16 @@ def list_courses():
 def add_course():
     if not (current_user.is_admin() or current_user.is_department_head()): return redirect(url_for('dashboard'))
     if request.method == 'POST':
-        db.session.add(Course(
+        course = Course(
             code=request.form.get('code'), name=request.form.get('name'), department_id=request.form.get('department_id'),
             instructor_id=request.form.get('instructor_id') or None, exam_duration=int(request.form.get('exam_duration', 90)),
-            exam_type=request.form.get('exam_type', 'yazılı'), has_exam=request.form.get('has_exam') == 'on'
-        ))
+            exam_type=request.form.get('exam_type', 'yazılı'), has_exam=request.form.get('has_exam') == 'on',
+            special_duration=request.form.get('special_duration', type=int) or None # saat
+        )
+        db.session.add(course)
         db.session.commit()
         flash('Ders eklendi!', 'success')
+        replan_if_scheduled([course.id])
         return redirect(url_for('list_courses'))
     return render_template('add_course.html', departments=Department.query.all(), teachers=User.query.filter_by(role='teacher').all())
 
@@ -141,77 +160,147 @@ def manage_classrooms():
 @login_required
 def auto_planning():
     if not (current_user.is_admin() or current_user.is_department_head()): return jsonify({'error': 'Yetkiniz yok!'}), 403
-    from planlama_algoritmasi import generate_exam_schedule
-    ExamSchedule.query.delete()
-    db.session.commit()
-    result = generate_exam_schedule()
+    from planlama_isleri import submit_planning_job
+    params = request.get_json(silent=True) or {}
+    try:
+        job_params = {
+            'engine': params.get('engine', 'greedy'),
+            'time_limit': float(params.get('time_limit', 30)),
+            'improve_time': float(params.get('improve_time', 0)),
+            'runs': int(params.get('runs', 16)),
+            'workers': int(params['workers']) if params.get('workers') else None,
+        }
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Geçersiz planlama parametresi.'}), 400
+    # Planlama arka planda çalışır; eski program yenisi commit edilene kadar görünür kalır
+    job_id = submit_planning_job(app, job_params, user_id=current_user.id)
+    return jsonify({'success': True, 'job_id': job_id, 'status_url': url_for('planning_job_status', job_id=job_id)}), 202
+
+def replan_if_scheduled(course_ids=(), classroom_ids=()):
+    """Program varsa değişikliği artımlı olarak programa yansıtır"""
+    if not ExamSchedule.query.first(): return None
+    from artimli_planlama import replan_incremental
+    result = replan_incremental(course_ids=course_ids, classroom_ids=classroom_ids)
     if result.get('success'):
-        flash(f"Planlama tamamlandı! {result.get('scheduled', 0)} ders planlandı.", 'success')
-        return jsonify({'success': True, 'scheduled': result.get('scheduled', 0)})
+        flash(f"Program güncellendi: {result.get('affected_groups', 0)} grup yeniden yerleştirildi.", 'info')
     else:
-        flash(f"Planlama hatası: {result.get('error')}", 'error')
-        return jsonify({'success': False, 'error': result.get('error')})
+        flash(f"Program güncellenemedi: {result.get('error')}", 'error')
+    return result
+
+@app.route('/planning/replan', methods=['POST'])
+@login_required
+def incremental_planning():
+    if not (current_user.is_admin() or current_user.is_department_head()): return jsonify({'error': 'Yetkiniz yok!'}), 403
+    from artimli_planlama import replan_incremental
+    params = request.get_json(silent=True) or {}
+    try:
+        course_ids = [int(i) for i in params.get('course_ids', [])]
+        classroom_ids = [int(i) for i in params.get('classroom_ids', [])]
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Geçersiz ders/derslik kimliği.'}), 400
+    return jsonify(replan_incremental(course_ids=course_ids, classroom_ids=classroom_ids))
+
+@app.route('/planning/jobs/<int:job_id>')
+@login_required
+def planning_job_status(job_id):
+    if not (current_user.is_admin() or current_user.is_department_head()): return jsonify({'error': 'Yetkiniz yok!'}), 403
+    from planlama_isleri import job_status
+    job = db.session.get(PlanningJob, job_id)
+    if not job: return jsonify({'error': 'İş bulunamadı.'}), 404
+    return jsonify(job_status(job))
+
+@app.route('/planning/jobs/<int:job_id>/cancel', methods=['POST'])
+@login_required
+def cancel_planning_job(job_id):
+    if not (current_user.is_admin() or current_user.is_department_head()): return jsonify({'error': 'Yetkiniz yok!'}), 403
+    from planlama_isleri import cancel_planning_job as cancel_job
+    if not cancel_job(job_id):
+        return jsonify({'success': False, 'error': 'İş iptal edilemez (bulunamadı ya da bitti).'}), 409
+    return jsonify({'success': True})
 
 # --- GÜNCELLENMİŞ VE GÜVENLİ PROGRAM GÖRÜNTÜLEME ---
 # --- GÜNCELLENMİŞ PROGRAM GÖRÜNTÜLEME (HTML İLE UYUMLU) ---
 @app.route('/program')
 @login_required
 def programi_goruntule():
+    # Sayfa = program sürümü + kullanıcı + bölüm süzgeci listesi; ETag'in tamamı eşleşirse 304
+    # (Last-Modified yalnız ek koşul). Gösterilecek flash mesajı varsa sayfa yeniden üretilir.
+    version, updated_at = schedule_version()
+    departments = Department.query.order_by(Department.id).all()
+    departments_tag = zlib.crc32(repr([(d.id, d.name) for d in departments]).encode())
+    etag = f"program-{version}-{current_user.id}-{departments_tag:08x}"
+    if (request.if_none_match.contains(etag) and not session.get('_flashes') and (
+            not request.if_modified_since or
+            (updated_at and request.if_modified_since >= updated_at.astimezone(timezone.utc)))):
+        return _program_response(app.response_class(status=304), etag, updated_at)
+
+    # Gruplanmış program sürüm başına bir kez üretilir; hocalar için yalnızca süzgeç uygulanır
     if current_user.is_admin(): 
-        raw_schedules = ExamSchedule.query.all()
+        schedules = grouped_program(version)
     elif current_user.is_teacher(): 
-        raw_schedules = ExamSchedule.query.filter_by(teacher_id=current_user.id).all()
+        schedules = grouped_program(version, ('teacher', current_user.id), lambda r: r['teacher_id'] == current_user.id)
     elif current_user.is_student():
-        try:
-            courses = Course.query.join(CourseStudent).filter(CourseStudent.student_no == current_user.username).all()
-            raw_schedules = ExamSchedule.query.filter(ExamSchedule.course_id.in_([c.id for c in courses])).all()
-        except:
-            raw_schedules = []
+        # Öğrenci indeksi program kaydedilirken üretilir (student_timetables)
+        schedules = student_timetable(current_user.username)
     else: 
-        raw_schedules = []
-
-    # GRUPLAMA MANTIĞI: Aynı Tarih, Saat ve Sınıftakileri Birleştir
-    grouped_schedules = {}
-    
-    for sch in raw_schedules:
-        # Veri bütünlüğü kontrolü
-        if not sch.course or not sch.classroom: continue
-
-        key = (sch.exam_date, sch.start_time, sch.classroom_id)
-        
-        if key not in grouped_schedules:
-            grouped_schedules[key] = {
-                'date': sch.exam_date,
-                'time': sch.start_time,
-                'classroom': sch.classroom,
-                'additional_classrooms': sch.additional_classrooms,
-                'teacher': sch.teacher,
-                'courses': [sch.course],
-                'course_codes_str': sch.course.code,
-                'course_name': sch.course.name 
-            }
-        else:
-            if sch.course not in grouped_schedules[key]['courses']:
-                grouped_schedules[key]['courses'].append(sch.course)
-            
-            # Kodları yan yana ekle (BLM101, SEC130 gibi)
-            if sch.course.code not in grouped_schedules[key]['course_codes_str']:
-                grouped_schedules[key]['course_codes_str'] += f", {sch.course.code}"
-    
-    final_list = list(grouped_schedules.values())
-    final_list.sort(key=lambda x: (x['date'], x['time']))
+        schedules = []
 
     # is_grouped=True parametresiyle gönderiyoruz
-    return render_template('program.html', schedules=final_list, is_grouped=True)
+    # PDF süzgeçleri için seçenekler (görünen programdan)
+    days = sorted({item['date'] for item in schedules})
+    rooms = sorted({(item['classroom']['id'], item['classroom']['name']) for item in schedules}, key=lambda r: r[1])
+    response = app.make_response(render_template('program.html', schedules=schedules, is_grouped=True,
+                                                 departments=departments, days=days, rooms=rooms))
+    return _program_response(response, etag, updated_at)
+
+def _program_response(response, etag, updated_at):
+    response.set_etag(etag)
+    if updated_at:
+        response.last_modified = updated_at.astimezone(timezone.utc)
+    # Kullanıcıya özel sayfa: paylaşılan önbellekte tutulmaz, her seferinde doğrulanır
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
 
 @app.route('/cikti/<format_type>')
 @login_required
 def cikti_al(format_type):
-    from cikti_araclari import pdf_cikti_al, excel_cikti_al
-    schedules = ExamSchedule.query.all()
-    if format_type == 'pdf': return send_file(pdf_cikti_al(schedules), as_attachment=True, download_name='sinav_programi.pdf')
-    elif format_type == 'excel': return send_file(excel_cikti_al(schedules), as_attachment=True, download_name='sinav_programi.xlsx')
-    return redirect(url_for('programi_goruntule'))
+    from cikti_araclari import cached_export, download_name, CIKTI_TURLERI
+    if format_type not in CIKTI_TURLERI: return redirect(url_for('programi_goruntule'))
+    
+    # Süzgeçler: ?department_id=..&day=YYYY-MM-DD&classroom_id=..
+    # Her süzgeç değeri ayrı bir önbellek dosyası: yalnız var olan bölüm/derslik ve programdaki günler kabul edilir
+    department_id = request.args.get('department_id', type=int)
+    classroom_id = request.args.get('classroom_id', type=int)
+    day = request.args.get('day', type=date.fromisoformat)
+    dept = db.session.get(Department, department_id) if department_id else None
+    room = db.session.get(Classroom, classroom_id) if classroom_id else None
+    if (department_id and not dept) or (classroom_id and not room) or (
+            day and not db.session.query(ExamSchedule.id).filter_by(exam_date=day).first()):
+        abort(404)
+    options = {}
+    if format_type == 'pdf':
+        title = "2025-2026 Guz Donemi Sinav Programi"
+        parts = []
+        if dept: parts.append(dept.name)
+        if day: parts.append(day.strftime('%d.%m.%Y'))
+        if room: parts.append(room.name)
+        if parts: title += f" ({' / '.join(parts)})"
+        options['title'] = title
+    
+    # Çıktı program sürümü başına bir kez üretilir; sonraki istekler hazır dosyayı alır
+    version, _ = schedule_version()
+    path = cached_export(os.path.join(app.instance_path, 'exports'), format_type, version,
+                         department_id, day, classroom_id, **options)
+    return send_file(path, as_attachment=True, download_name=download_name(format_type, department_id, day, classroom_id),
+                     conditional=True)
+
+@app.route('/admin/metrics')
+@login_required
+def metrics():
+    if not current_user.is_admin(): return jsonify({'error': 'Yetkiniz yok!'}), 403
+    # Prometheus metin biçimi (bu sürecin değerleri)
+    return app.response_class(olcumleme.prometheus_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 # --- BURASI YENİ YAPIDIR (PAKET FORMATINI ALIR) ---
 @app.route('/admin/import-pdfs', methods=['POST'])
@@ -229,95 +318,29 @@ def import_pdfs():
     try:
         default_dept_id = ensure_defaults()
         # ARTIK STUDENTS_DATA {CODE: {STUDENTS: [], NAME: ""}} FORMATINDA
-        students_data, proximity_data, tum_derslikler, room_capacities = import_all_data(data_dir)
-        
-        # 1. Derslikleri Kaydet
-        for derslik_adi in tum_derslikler:
-            if derslik_adi and len(derslik_adi) <= 20:
-                kapasite = room_capacities.get(derslik_adi, 40)
-                existing = Classroom.query.filter_by(name=derslik_adi).first()
-                if not existing:
-                    db.session.add(Classroom(name=derslik_adi, capacity=kapasite, is_available=True))
-                else:
-                    existing.capacity = kapasite
-
-        # 2. Dersleri Kaydet
-        for course_code, data in students_data.items():
-            students = data['students']
-            course_name = data['name']
-            
-            if not students: continue
-            
-            course = Course.query.filter_by(code=course_code).first()
-            if not course:
-                course = Course(
-                    code=course_code,
-                    name=course_name, # MANUEL LİSTEDEN GELEN DOĞRU İSİM
-                    department_id=default_dept_id,
-                    exam_duration=60,
-                    has_exam=True
-                )
-                db.session.add(course)
-                db.session.commit()
-            else:
-                course.name = course_name # İsim güncelle
-                db.session.commit()
-            
-            # Öğrencileri Ekle
-            for student in students:
-                exist = CourseStudent.query.filter_by(course_id=course.id, student_no=student['student_no']).first()
-                if not exist:
-                    db.session.add(CourseStudent(course_id=course.id, student_no=student['student_no'], student_name=student['name']))
-                
-                user_exist = User.query.filter_by(username=student['student_no']).first()
-                if not user_exist:
-                    std_name = student['name'] if student['name'] else "Ogrenci"
-                    new_student_user = User(
-                        username=student['student_no'],
-                        email=f"{student['student_no']}@ogrenci.kostu.edu.tr",
-                        role='student',
-                        name=std_name
-                    )
-                    new_student_user.set_password('123456')
-                    db.session.add(new_student_user)
-
-            course.student_count = len(students)
+        workers = request.form.get('workers', type=int) or os.cpu_count() or 1
+        import_report = {}
+        os.makedirs(app.instance_path, exist_ok=True)
+        cache_path = os.path.join(app.instance_path, 'roster_cache.pkl')
+        students_data, proximity_data, tum_derslikler, room_capacities = import_all_data(data_dir, workers=workers, report=import_report, cache_path=cache_path)
         
-        # Yakınlıklar
-        for prox in proximity_data:
-            c1 = Classroom.query.filter_by(name=prox['classroom1']).first()
-            c2 = Classroom.query.filter_by(name=prox['classroom2']).first()
-            if c1 and c2:
-                exist = ClassroomProximity.query.filter(
-                    ((ClassroomProximity.classroom1_id == c1.id) & (ClassroomProximity.classroom2_id == c2.id)) |
-                    ((ClassroomProximity.classroom1_id == c2.id) & (ClassroomProximity.classroom2_id == c1.id))
-                ).first()
-                if not exist:
-                    db.session.add(ClassroomProximity(classroom1_id=c1.id, classroom2_id=c2.id))
-        
-        db.session.commit()
-        
-        # Hoca Hesapları
-        teachers = ['Elif Pinar Hacibeyoglu', 'Cuneyt Yazici', 'Vildan Yazici', 'Orkun Karabatak']
-        for t_name in teachers:
-            u_name = unidecode.unidecode(t_name.lower().replace(' ', ''))
-            if not User.query.filter_by(username=u_name).first():
-                t_user = User(username=u_name, email=f'{u_name}@kostu.edu.tr', role='teacher', name=t_name)
-                t_user.set_password('123456')
-                db.session.add(t_user)
-        db.session.commit()
-        
-        import random
-        all_courses = Course.query.all()
-        all_teachers = User.query.filter_by(role='teacher').all()
-        if all_teachers:
-            for c in all_courses:
-                if not c.instructor_id:
-                    t = random.choice(all_teachers)
-                    c.instructor_id = t.id
-            db.session.commit()
+        # sync: listelerden çıkan öğrencilerin kayıtlarını da sil (delta aktarım)
+        sync = request.form.get('sync') == '1'
+        save_report = import_roster_data(students_data, proximity_data, tum_derslikler, room_capacities, default_dept_id, sync=sync)
 
+        slowest = max(import_report['files'], key=lambda f: f['seconds'], default=None)
         flash(f'Tüm veriler başarıyla yüklendi!', 'success')
+        flash(f"{len(import_report['files'])} liste {import_report['total_seconds']} sn'de okundu ({import_report['workers']} işçi, {import_report['cached']} önbellekten)"
+              + (f", en yavaş: {slowest['file']} ({slowest['seconds']} sn)" if slowest else ''), 'info')
+        flash(f"{save_report['rows']} satır {save_report['seconds']} sn'de yazıldı ({save_report['rows_per_sec']} satır/sn)", 'info')
+        diff = save_report['diff']
+        if diff:
+            flash(f"Kayıt farkı: {len(diff)} ders, +{sum(d['added'] for d in diff.values())} / -{sum(d['removed'] for d in diff.values())} öğrenci", 'info')
+            replan_if_scheduled([c_id for (c_id,) in db.session.query(Course.id).filter(Course.code.in_(list(diff)))])
+        if save_report['dropped_courses']:
+            dropped = save_report['dropped_courses']
+            flash(f"Listesi gelmeyen {len(dropped)} dersin kayıtları silindi: {', '.join(dropped[:10])}"
+                  + (' ...' if len(dropped) > 10 else ''), 'info')
     
     except Exception as e:
         flash(f'Veri yükleme hatası: {str(e)}', 'error')
@@ -352,6 +375,7 @@ def teacher_availability():
                     db.session.add(av)
             db.session.commit()
             flash('Müsaitlik durumu güncellendi!', 'success')
+            replan_if_scheduled([c.id for c in my_courses])
             return redirect(url_for('teacher_availability'))
         except Exception as e:
             db.session.rollback()
@@ -362,17 +386,37 @@ def teacher_availability():
 # --- ANA.PY DOSYASININ EN ALTI ---
 
 
+@app.cli.command('migrate')
+def migrate_command():
+    """Çok işçili sunucudan (gunicorn vb.) önce şemayı hazırlar: flask --app ana migrate"""
+    migrate()
+
+@app.cli.command('sinav-takvimi')
+@click.option('--term', required=True, help="Dönem adı, ör. '2025-2026 Bahar'")
+@click.option('--days', required=True, help='Virgülle ayrılmış sınav günleri (YYYY-AA-GG)')
+@click.option('--times', default='09:00-11:00,11:00-13:00,13:00-15:00,15:00-17:00,17:00-19:00',
+              show_default=True, help='Her günün oturumları (SS:DD-SS:DD)')
+def exam_periods_command(term, days, times):
+    """Dönemin sınav oturumlarını tanımlar (mevcutların yerine): flask --app ana sinav-takvimi --term ... --days ..."""
+    try:
+        sessions = [tuple(datetime.strptime(t.strip(), '%H:%M').time() for t in part.split('-'))
+                    for part in times.split(',') if part.strip()]
+        periods = [(date.fromisoformat(d.strip()), start, end)
+                   for d in days.split(',') if d.strip() for start, end in sessions]
+        count = replace_periods(term, periods)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        raise click.ClickException(str(e))
+    print(f"📅 {term}: {count} oturum kaydedildi.")
+
 if __name__ == '__main__':
     with app.app_context():
-        # 1. Eski veritabanını tamamen uçur (Hatayı çözen kısım)
-        print("⚠️ Eski veritabanı temizleniyor...")
-        db.drop_all()
+        # 1. Veriler korunur: eksik tablolar ve bekleyen şema göçleri uygulanır
+        print("✅ Veritabanı şeması güncelleniyor...")
+        migrate()
         
-        # 2. Yenisini tertemiz oluştur
-        print("✅ Yeni tablolar oluşturuluyor...")
-        db.create_all()
-        
-        # 3. Admin hesabını tekrar aç
+        # 2. Admin hesabı yoksa aç
         if not User.query.filter_by(username='admin').first():
             admin = User(username='admin', email='admin@kostu.edu.tr', role='admin', name='Sistem Yöneticisi')
             admin.set_password('admin123')
@@ -380,5 +424,10 @@ if __name__ == '__main__':
             db.session.commit()
             print("👤 Admin hesabı oluşturuldu.")
 
+        # 3. Önceki çalıştırmadan bekleyen planlama işleri (yalnız sunan süreçte; reloader'ın ana süreci değil)
+        if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+            from planlama_isleri import start_worker_on_boot
+            start_worker_on_boot(app)
+
     print("🚀 Server başlatılıyor...")
     app.run(debug=True, port=5000)
\ No newline at end of file
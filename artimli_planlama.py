@@ -0,0 +1,126 @@
+"""
+Artımlı (incremental) yeniden planlama
+Mevcut programı başlangıç noktası olarak alır; yalnızca değişiklikten etkilenen
+grupları (değişen dersler, kullanılamaz hale gelen derslikler, çakışma grafında
+artık geçersiz kalan yerleşimler) yeniden yerleştirir. Diğer satırlara dokunulmaz.
+"""
+import time as _time
+from modeller import db, ExamSchedule
+from planlama_verisi import load_planning_snapshot, sql_sayaci
+from program_onbellegi import bump_schedule_version
+from planlama_algoritmasi import plan_greedy, build_exam_rows
+from derslik_indeksi import build_room_index, occupy, is_free
+from sinav_takvimi import snapshot_calendar, covered_slots
+
+def _current_placements(snapshot):
+    """Mevcut ExamSchedule satırlarını grup yerleşimlerine çevirir: grup -> yerleşim (ya da None = tutarsız)"""
+    course_group = {c['id']: g_idx for g_idx, g in enumerate(snapshot['groups']) for c in g['courses']}
+    room_by_id = {r['id']: r for r in snapshot['classrooms']}
+    room_by_name = {r['name']: r for r in snapshot['classrooms']}
+
+    rows = db.session.query(
+        ExamSchedule.course_id, ExamSchedule.classroom_id, ExamSchedule.additional_classrooms,
+        ExamSchedule.exam_date, ExamSchedule.start_time
+    ).all()
+
+    current = {}
+    for course_id, classroom_id, extras, exam_date, start_time in rows:
+        g_idx = course_group.get(course_id)
+        if g_idx is None: continue
+        rooms = [room_by_id.get(classroom_id)]
+        rooms += [room_by_name.get(name.strip()) for name in (extras or '').split(',') if name.strip()]
+        # Kullanılamaz / silinmiş derslik varsa yerleşim geçersiz
+        placement = None if None in rooms else {'group': g_idx, 'date': exam_date, 'time': start_time, 'rooms': rooms}
+        if g_idx not in current:
+            current[g_idx] = placement
+        elif current[g_idx] is not None and (
+                placement is None or (placement['date'], placement['time']) != (current[g_idx]['date'], current[g_idx]['time'])):
+            # Aynı gruptaki dersler farklı yerlerdeyse grubu baştan yerleştir
+            current[g_idx] = None
+    return current
+
+def replan_incremental(course_ids=(), classroom_ids=()):
+    """
+    Değişen dersler (course_ids) ve derslikler (classroom_ids) için programı onarır.
+    Etkilenmeyen yerleşimler aynen korunur; sadece etkilenen grupların satırları silinip yeniden yazılır.
+    """
+    results = {'success': False, 'scheduled': 0, 'error': None}
+    start = _time.perf_counter()
+    try:
+        with sql_sayaci() as sql:
+            snapshot = load_planning_snapshot()
+            groups = snapshot['groups']
+            current = _current_placements(snapshot)
+
+            changed_courses = set(course_ids)
+            changed_rooms = set(classroom_ids)
+            calendar = snapshot_calendar(snapshot)
+
+            # 1. Etkilenen grupları bul; kalanların geçerliliğini sırayla doğrula.
+            # Tüm grupların çakışma grafı (O(G²)) kurulmaz: korunan yerleşimler slot başına
+            # öğrenci bitset'iyle doğrulanır, maskeler yalnız etkilenen gruplar için kurulur.
+            affected = set()
+            fixed = []
+            slot_students = [0] * len(calendar['slots']) # slot -> korunan grupların öğrenci bitleri
+            rooms_index = build_room_index(snapshot['classrooms'], snapshot['proximity'])
+            for g_idx, group in enumerate(groups):
+                p = current.get(g_idx)
+                if p is None or any(c['id'] in changed_courses for c in group['courses']):
+                    affected.add(g_idx)
+                    continue
+                # Takvimde olmayan oturum ya da (süre değişince) gün sonunu aşan sınav geçersiz
+                t = calendar['index'].get((p['date'], p['time']))
+                span = covered_slots(calendar, t, group['duration']) if t is not None else None
+                room_ids = [r['id'] for r in p['rooms']]
+                if (span is None
+                        or p['date'].weekday() in group['blocked_days']
+                        or changed_rooms.intersection(room_ids)
+                        or sum(r['capacity'] for r in p['rooms']) < group['total_count']
+                        or any(group['student_bits'] & slot_students[s] for s in span)
+                        or not is_free(rooms_index, span, p['rooms'])):
+                    affected.add(g_idx)
+                    continue
+                fixed.append(p)
+                for s in span:
+                    slot_students[s] |= group['student_bits']
+                occupy(rooms_index, span, p['rooms'])
+
+            # 2. Sadece etkilenen grupları (kalabalıktan aza) mevcut programın üzerine yerleştir
+            masks = [0] * len(groups)
+            for a in affected:
+                bits = groups[a]['student_bits']
+                if not bits: continue
+                for j, other in enumerate(groups):
+                    if j != a and bits & other['student_bits']:
+                        masks[a] |= 1 << j
+            order = sorted(affected, key=lambda g: groups[g]['total_count'], reverse=True)
+            plan = plan_greedy(snapshot, order=order, fixed=fixed, conflict_masks=masks)
+            new_placements = [p for p in plan['placements'] if p['group'] in affected]
+
+            # 3. Yalnız etkilenen derslerin satırlarını değiştir (tek transaction)
+            touched = {c['id'] for g in affected for c in groups[g]['courses']} | changed_courses
+            scheduled_count = 0
+            if touched:
+                ExamSchedule.query.filter(ExamSchedule.course_id.in_(touched)).delete(synchronize_session=False)
+                for p in new_placements:
+                    rows = build_exam_rows(snapshot, p)
+                    db.session.add_all(rows)
+                    scheduled_count += len(rows)
+                bump_schedule_version(course_ids=touched) # Yalnız bu derslerin öğrencilerinin indeksi yenilenir
+            db.session.commit()
+
+        results['success'] = True
+        results['scheduled'] = scheduled_count
+        results['affected_groups'] = len(affected)
+        results['kept_groups'] = len(fixed)
+        results['sql'] = sql['count']
+        results['time'] = round(_time.perf_counter() - start, 3)
+        if plan['unscheduled']:
+            results['error'] = f"Yerleşemeyen: {len(plan['unscheduled'])} grup."
+        print(f"♻️ Artımlı planlama: {results}")
+        return results
+
+    except Exception as e:
+        print(f"HATA: {e}")
+        db.session.rollback()
+        return {'success': False, 'error': str(e)}
@@ -1,23 +1,86 @@
+import io
 import os
+import re
+import threading
+import zlib
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
-import pandas as pd
+from sqlalchemy.orm import aliased
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Border, Side, Alignment
+from modeller import db, ExamSchedule, Course, Classroom, User
+from olcumleme import timer, inc
 
-def pdf_cikti_al(schedules):
+# Bir tablo parçasındaki satır sayısı (yaklaşık bir A4 sayfası)
+SAYFA_SATIRI = 30
+
+def export_rows(department_id=None, day=None, classroom_id=None):
+    """
+    Çıktı satırlarını (tarih, saat, kod, ad, öğrenci sayısı, derslik, ek derslikler, hoca) TEK sorguda,
+    tarih/saat sırasıyla ve parça parça (yield_per) üretir. Süzgeçler: bölüm, gün, derslik.
+    """
+    teacher = aliased(User)
+    query = (db.session.query(ExamSchedule.exam_date, ExamSchedule.start_time, Course.code, Course.name,
+                              Course.student_count, Classroom.name, ExamSchedule.additional_classrooms, teacher.name)
+             .join(Course, ExamSchedule.course_id == Course.id)
+             .join(Classroom, ExamSchedule.classroom_id == Classroom.id)
+             .outerjoin(teacher, ExamSchedule.teacher_id == teacher.id))
+    if department_id:
+        query = query.filter(Course.department_id == department_id)
+    if day:
+        query = query.filter(ExamSchedule.exam_date == day)
+    room_name = None
+    if classroom_id:
+        room = db.session.get(Classroom, classroom_id)
+        room_name = room.name if room else None
+    for row in query.order_by(ExamSchedule.exam_date, ExamSchedule.start_time, ExamSchedule.id).yield_per(500):
+        if room_name:
+            # Ana derslik ya da ek derslik listesinde geçen sınavlar
+            extras = [r.strip() for r in (row[6] or '').split(',')]
+            if row[5] != room_name and room_name not in extras: continue
+        yield row
+
+class _ParcaliAkis(list):
     """
-    Sınav programını PDF olarak oluşturur.
+    doc.build için tembel flowable listesi: tablolar üreteçten, baştaki eleman tüketildikçe
+    üretilir. Böylece bellekte tüm program değil, yalnız birkaç sayfalık tablo bulunur.
+    """
+    def __init__(self, head, generator):
+        super().__init__(head)
+        self._generator = generator
+
+    def _fill(self):
+        while self._generator is not None and list.__len__(self) < 2:
+            try:
+                self.append(next(self._generator))
+            except StopIteration:
+                self._generator = None
+
+    def __len__(self):
+        self._fill()
+        return list.__len__(self)
+
+    def __getitem__(self, index):
+        self._fill()
+        return list.__getitem__(self, index)
+
+def pdf_cikti_al(rows, title="2025-2026 Guz Donemi Sinav Programi", output=None):
+    """
+    Sınav programını PDF olarak oluşturur; output (dosya yolu) verilmezse bellek içi tampon (BytesIO) döner.
+    rows: export_rows() satırları. Tablo sayfa boyunda parçalara bölünür (her parçada başlık tekrarlanır).
     Sütun taşmalarını engellemek için metin kaydırma (text wrapping) özelliği eklenmiştir.
     """
-    filename = "sinav_programi.pdf"
+    buffer = output or io.BytesIO()
     
     # PDF Ayarları
     # Kenar boşluklarını (margins) ayarlayarak tabloya daha fazla yer açtık.
     doc = SimpleDocTemplate(
-        filename, 
+        buffer, 
         pagesize=A4,
         rightMargin=30, 
         leftMargin=30, 
@@ -25,8 +88,6 @@ def pdf_cikti_al(schedules):
         bottomMargin=18
     )
     
-    elements = []
-    
     # Stilleri Al
     styles = getSampleStyleSheet()
     
@@ -43,48 +104,13 @@ def pdf_cikti_al(schedules):
         textColor=colors.black
     )
     
-    # Başlık Ekle
-    elements.append(Paragraph("2025-2026 Guz Donemi Sinav Programi", title_style))
-    elements.append(Spacer(1, 20))
-    
     # Tablo Verisi Hazırla
     # Başlıklar
     headers = ['Tarih', 'Saat', 'Ders Kodu', 'Ders Adi', 'Derslik', 'Hoca']
-    data = [headers]
-    
-    # Verileri Sırala (Tarihe göre)
-    sorted_schedules = sorted(schedules, key=lambda x: (x.exam_date, x.start_time))
-    
-    for sch in sorted_schedules:
-        # Tarih formatla
-        tarih = sch.exam_date.strftime('%d.%m.%Y')
-        saat = sch.start_time.strftime('%H:%M')
-        
-        # Ek sınıflar varsa ekle
-        derslik_str = sch.classroom.name
-        if sch.additional_classrooms:
-            derslik_str += f"\n(+{sch.additional_classrooms})"
-            
-        hoca_str = sch.teacher.name if sch.teacher else "-"
-        ders_adi_str = sch.course.name if sch.course else "-"
-        ders_kodu = sch.course.code if sch.course else "-"
-        
-        # Bu işlem, metin sütuna sığmadığında otomatik olarak alt satıra geçmesini sağlar.
-        p_ders_adi = Paragraph(ders_adi_str, cell_style)
-        p_hoca = Paragraph(hoca_str, cell_style)
-        p_derslik = Paragraph(derslik_str, cell_style)
-        
-        # Veriyi satır olarak ekle (Paragraph nesneleriyle beraber)
-        data.append([tarih, saat, ders_kodu, p_ders_adi, p_derslik, p_hoca])
-        
-    # Tablo Oluştur
     col_widths = [55, 35, 55, 190, 85, 115]
     
-    # repeatRows=1: Tablo başlığının her yeni sayfada tekrar etmesini sağlar
-    t = Table(data, colWidths=col_widths, repeatRows=1)
-    
     # Tablo Stili
-    t.setStyle(TableStyle([
+    table_style = TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.grey), # Başlık arka plan rengi
         ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke), # Başlık yazı rengi
         ('ALIGN', (0, 0), (-1, -1), 'CENTER'), # Yatay hizalama
@@ -94,36 +120,119 @@ def pdf_cikti_al(schedules):
         ('BACKGROUND', (0, 1), (-1, -1), colors.beige), # Satır renkleri
         ('GRID', (0, 0), (-1, -1), 1, colors.black),
         ('FONTSIZE', (0, 0), (-1, -1), 8) # Yazı boyutu
-    ]))
+    ])
+    
+    def make_row(row):
+        exam_date, start_time, ders_kodu, ders_adi_str, _, derslik_str, extras, hoca_str = row
+        # Ek sınıflar varsa ekle
+        if extras:
+            derslik_str += f"\n(+{extras})"
+        # Bu işlem, metin sütuna sığmadığında otomatik olarak alt satıra geçmesini sağlar.
+        return [exam_date.strftime('%d.%m.%Y'), start_time.strftime('%H:%M'), ders_kodu or "-",
+                Paragraph(ders_adi_str or "-", cell_style), Paragraph(derslik_str, cell_style), Paragraph(hoca_str or "-", cell_style)]
+    
+    def tables():
+        chunk = []
+        for row in rows:
+            chunk.append(make_row(row))
+            if len(chunk) == SAYFA_SATIRI:
+                yield make_table(chunk)
+                chunk = []
+        if chunk:
+            yield make_table(chunk)
+    
+    def make_table(chunk):
+        # repeatRows=1: Parça sayfaya sığmazsa başlık yeni sayfada tekrar eder
+        t = Table([headers] + chunk, colWidths=col_widths, repeatRows=1)
+        t.setStyle(table_style)
+        return t
     
-    elements.append(t)
+    # Başlık Ekle
+    head = [Paragraph(title, title_style), Spacer(1, 20)]
     
     # PDF'i Oluştur
-    doc.build(elements)
+    doc.build(_ParcaliAkis(head, tables()))
     
-    return filename
+    if output is None: buffer.seek(0)
+    return buffer
 
-def excel_cikti_al(schedules):
+def excel_cikti_al(rows, output=None):
     """
-    Sınav programını Excel olarak oluşturur.
+    Sınav programını Excel olarak oluşturur (write-only: satırlar akıtılır, bellekte tablo tutulmaz).
+    rows: export_rows() satırları; output (dosya yolu) verilmezse BytesIO döner.
     """
-    data = []
-    # Verileri Sırala
-    sorted_schedules = sorted(schedules, key=lambda x: (x.exam_date, x.start_time))
-    
-    for sch in sorted_schedules:
-        data.append({
-            'Tarih': sch.exam_date.strftime('%d.%m.%Y'),
-            'Saat': sch.start_time.strftime('%H:%M'),
-            'Ders Kodu': sch.course.code if sch.course else "-",
-            'Ders Adı': sch.course.name if sch.course else "-",
-            'Öğrenci Sayısı': sch.course.student_count if sch.course else 0,
-            'Derslik': sch.classroom.name + (f" (+{sch.additional_classrooms})" if sch.additional_classrooms else ""),
-            'Öğretim Üyesi': sch.teacher.name if sch.teacher else "-"
-        })
-        
-    df = pd.DataFrame(data)
-    filename = "sinav_programi.xlsx"
-    df.to_excel(filename, index=False)
-    
-    return filename
\ No newline at end of file
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Sheet1')
+    
+    # Başlık satırı (pandas to_excel görünümü: kalın, kenarlıklı, ortalı)
+    header_font = Font(bold=True)
+    header_border = Border(*(Side(style='thin'),) * 4)
+    header = []
+    for title in ['Tarih', 'Saat', 'Ders Kodu', 'Ders Adı', 'Öğrenci Sayısı', 'Derslik', 'Öğretim Üyesi']:
+        cell = WriteOnlyCell(ws, value=title)
+        cell.font, cell.border, cell.alignment = header_font, header_border, Alignment(horizontal='center')
+        header.append(cell)
+    ws.append(header)
+    
+    for exam_date, start_time, code, name, student_count, room, extras, teacher in rows:
+        ws.append([
+            exam_date.strftime('%d.%m.%Y'),
+            start_time.strftime('%H:%M'),
+            code or "-",
+            name or "-",
+            student_count or 0,
+            room + (f" (+{extras})" if extras else ""),
+            teacher or "-",
+        ])
+    
+    target = output or io.BytesIO()
+    wb.save(target)
+    if output is None: target.seek(0)
+    return target
+
+# --- Program sürümü başına önbelleğe alınmış çıktılar ---
+_export_lock = threading.Lock()
+_CIKTI_ADI = re.compile(r'sinav_programi_v(\d+)[_.]')
+CIKTI_TURLERI = {'pdf': ('pdf', pdf_cikti_al), 'excel': ('xlsx', excel_cikti_al)}
+
+def _filter_key(department_id=None, day=None, classroom_id=None):
+    return ''.join(f'_{label}{value}' for label, value in (('bolum', department_id), ('gun', day), ('derslik', classroom_id)) if value)
+
+def download_name(format_type, department_id=None, day=None, classroom_id=None):
+    """İndirilen dosyanın adı (sürüm ve başlık özeti olmadan)"""
+    return f'sinav_programi{_filter_key(department_id, day, classroom_id)}.{CIKTI_TURLERI[format_type][0]}'
+
+def cached_export(export_dir, format_type, version, department_id=None, day=None, classroom_id=None, **kwargs):
+    """
+    Program sürümü (ve süzgeçler) için çıktı dosyasının yolunu döner; yoksa bir kez üretir.
+    Süzgeçler çağıran tarafından doğrulanmış olmalıdır (her değer yeni bir dosya demektir).
+    Ek seçenekler (ör. bölüm/derslik adını taşıyan PDF başlığı) özetlenip anahtara katılır:
+    ad değişince eski başlıklı dosya kullanılmaz. Dosya geçici adla yazılıp yerine taşınır,
+    daha eski sürümlere ait çıktılar silinir.
+    """
+    ext, builder = CIKTI_TURLERI[format_type]
+    key = _filter_key(department_id, day, classroom_id)
+    if kwargs:
+        key += f"_{zlib.crc32(repr(sorted(kwargs.items())).encode()):08x}"
+    prefix = f'sinav_programi_v{version}'
+    path = os.path.join(export_dir, f'{prefix}{key}.{ext}')
+    if os.path.exists(path):
+        inc('cikti_onbellek_toplam', format=format_type, sonuc='isabet')
+        return path
+    with _export_lock:
+        if os.path.exists(path):
+            inc('cikti_onbellek_toplam', format=format_type, sonuc='isabet')
+            return path
+        os.makedirs(export_dir, exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with timer('cikti_uretim_saniye', format=format_type):
+            builder(export_rows(department_id, day, classroom_id), output=tmp_path, **kwargs)
+        os.replace(tmp_path, path)
+        inc('cikti_onbellek_toplam', format=format_type, sonuc='uretim')
+        for name in os.listdir(export_dir):
+            # Yazılmakta olan geçici dosyalar ve güncel/yeni sürümler kalır; yalnız eski sürümler silinir
+            match = _CIKTI_ADI.match(name)
+            if not match or name.endswith('.tmp') or int(match.group(1)) >= version: continue
+            try: os.remove(os.path.join(export_dir, name))
+            except OSError: pass # Başka süreç silmiş ya da hâlâ gönderiyor olabilir
+    return path
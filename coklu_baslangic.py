@@ -0,0 +1,91 @@
+"""
+Paralel çoklu başlangıç (multi-start) planlama
+Greedy sıralaması rastgele bozularak N kez çalıştırılır; denemeler bir
+ProcessPoolExecutor üzerinde çekirdeklere dağıtılır. Snapshot her işçiye
+başlangıçta bir kez gönderilir ve salt okunur kullanılır.
+"""
+import os
+import time as _time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from planlama_algoritmasi import plan_greedy, random_group_order, snapshot_conflict_graph, PlanlamaIptal
+from yerel_arama import schedule_cost
+
+# İşçi sürecindeki salt okunur snapshot
+_SNAPSHOT = None
+# Paralel denemeler sürerken iptal isteği ve süre bu aralıkla (saniye) kontrol edilir
+IPTAL_ARALIGI = 0.5
+
+def _init_worker(snapshot):
+    global _SNAPSHOT
+    _SNAPSHOT = snapshot
+
+def _plan_score(snapshot, plan):
+    """Karşılaştırma anahtarı: önce yerleşen grup sayısı (çok), sonra yumuşak maliyet (az)"""
+    return (-len(plan['placements']), schedule_cost(snapshot, plan['placements']))
+
+def _run_seeds(seeds, deadline, snapshot=None, should_stop=None):
+    """Tohumları süre bitene kadar dener, en iyisini döner"""
+    snapshot = snapshot if snapshot is not None else _SNAPSHOT
+    best = best_score = best_seed = None
+    runs = 0
+    for seed in seeds:
+        if should_stop and should_stop(): raise PlanlamaIptal()
+        if runs and _time.time() >= deadline: break
+        # seed None = değiştirilmemiş (kalabalıktan aza) sıra
+        order = None if seed is None else random_group_order(snapshot['groups'], seed)
+        plan = plan_greedy(snapshot, order)
+        score = _plan_score(snapshot, plan)
+        runs += 1
+        if best_score is None or score < best_score:
+            best, best_score, best_seed = plan, score, seed
+    return {'plan': best, 'score': best_score, 'seed': best_seed, 'runs': runs}
+
+def plan_multi_start(snapshot, runs=16, workers=None, time_limit=30, seed=0, should_stop=None):
+    """
+    runs adet farklı sıralamayla greedy çalıştırır, en iyi planı döner.
+    workers: işçi süreç sayısı (varsayılan: çekirdek sayısı), time_limit: toplam saniye.
+    should_stop: True dönerse bekleyen denemeler iptal edilir ve PlanlamaIptal fırlatılır.
+    """
+    runs = max(int(runs), 1)
+    workers = max(1, min(int(workers or os.cpu_count() or 1), runs))
+    # Çakışma grafı işçilere gitmeden önce bir kez kurulur
+    snapshot_conflict_graph(snapshot)
+
+    seeds = [None] + [seed + i for i in range(1, runs)]
+
+    start = _time.perf_counter()
+    deadline = _time.time() + time_limit
+    if workers == 1:
+        results = [_run_seeds(seeds, deadline, snapshot, should_stop)]
+    else:
+        # Tohum başına bir iş: süre dolunca ya da iptal gelince kuyruktaki denemeler hiç başlamaz
+        results, stopped = [], False
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(snapshot,))
+        try:
+            pending = {pool.submit(_run_seeds, [s], deadline) for s in seeds}
+            while pending:
+                done, pending = wait(pending, timeout=IPTAL_ARALIGI, return_when=FIRST_COMPLETED)
+                results.extend(f.result() for f in done)
+                stopped = bool(should_stop and should_stop())
+                if stopped or (results and _time.time() >= deadline):
+                    for f in pending: f.cancel()
+                    break
+        finally:
+            # İptalde çalışmakta olan denemeler beklenmez (süreçleri kendi denemesini bitirip kapanır)
+            pool.shutdown(wait=not stopped, cancel_futures=True)
+        if stopped:
+            raise PlanlamaIptal()
+    elapsed = _time.perf_counter() - start
+
+    best = min(results, key=lambda r: r['score'])
+    plan = best['plan']
+    plan['stats'] = {
+        'runs': sum(r['runs'] for r in results),
+        'workers': workers,
+        'best_seed': best['seed'],
+        'placed': len(plan['placements']),
+        'cost': best['score'][1],
+        'time': round(elapsed, 3),
+    }
+    print(f"🎲 Çoklu başlangıç: {plan['stats']}")
+    return plan
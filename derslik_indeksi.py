@@ -0,0 +1,141 @@
+"""
+Derslik müsaitlik dizini (slot başına boş derslik bitset'leri)
+Derslikler kapasiteye göre artan sırayla bit konumlarına yerleştirilir; her (gün, saat)
+için dolu dersliklerin maskesi tutulur. Uzun sınavlar birden çok slotu kaplar; sorgular
+kaplanan slotların (keys) dolu maskelerinin birleşimi üzerinden yapılır. Böylece:
+  - "kapasitesi >= k olan en küçük boş derslik": ikili arama + birkaç bit işlemi
+  - "X kümesindeki boş derslikler": boş maske & küme maskesi
+Kümeler yakınlık grafının bağlı bileşenleridir (bina); küme başına dolu kapasite de
+tutulur, boş kapasitesi yetmeyen kümeler derslik kümesi aramasına hiç girmez.
+Dizin düz sözlüktür; planlama motorları (açgözlü, yerel arama, artımlı) ortak kullanır.
+"""
+from bisect import bisect_left, bisect_right
+
+def build_room_index(classrooms, proximity):
+    """Snapshot derslikleri ve yakınlık komşulukları için boş bir (hiç dolu slotu olmayan) dizin kurar"""
+    # Kapasite artan; eşit kapasitede snapshot'ta önce gelen daha YÜKSEK bitte (seçimde önceliği korunur)
+    order = sorted(range(len(classrooms)), key=lambda i: (classrooms[i]['capacity'], -i))
+    rooms = [classrooms[i] for i in order]
+    bit_of = {r['id']: b for b, r in enumerate(rooms)}
+
+    # Kümeler: yakınlık grafının bağlı bileşenleri
+    cluster_of = [-1] * len(rooms)
+    cluster_masks, cluster_caps = [], []
+    for b in range(len(rooms)):
+        if cluster_of[b] >= 0: continue
+        c_id, mask, cap = len(cluster_masks), 0, 0
+        cluster_of[b] = c_id
+        stack = [b]
+        while stack:
+            cur = stack.pop()
+            mask |= 1 << cur
+            cap += rooms[cur]['capacity']
+            for n in proximity.get(rooms[cur]['id'], ()):
+                nb = bit_of.get(n)
+                if nb is not None and cluster_of[nb] < 0:
+                    cluster_of[nb] = c_id
+                    stack.append(nb)
+        cluster_masks.append(mask)
+        cluster_caps.append(cap)
+
+    return {
+        'rooms': rooms, # bit -> derslik
+        'caps': [r['capacity'] for r in rooms], # bit -> kapasite (artan)
+        'bit': bit_of, # derslik id -> bit
+        'rank': [order[b] for b in range(len(rooms))], # bit -> snapshot sırası
+        'all': (1 << len(rooms)) - 1,
+        'cluster_of': cluster_of,
+        'cluster_masks': cluster_masks,
+        'cluster_caps': cluster_caps,
+        'slots': {}, # slot -> {'busy': dolu maske, 'used': küme başına dolu kapasite}
+    }
+
+def _slot(index, key):
+    state = index['slots'].get(key)
+    if state is None:
+        state = index['slots'][key] = {'busy': 0, 'used': [0] * len(index['cluster_caps'])}
+    return state
+
+def _mask(index, rooms):
+    # Dizinde olmayan (kullanıma kapalı) derslikler yok sayılır
+    mask = 0
+    for r in rooms:
+        b = index['bit'].get(r['id'])
+        if b is not None: mask |= 1 << b
+    return mask
+
+def _busy(index, keys):
+    # Sınavın kapladığı slotlardan herhangi birinde dolu olan derslikler
+    busy = 0
+    for key in keys:
+        state = index['slots'].get(key)
+        if state: busy |= state['busy']
+    return busy
+
+def occupy(index, keys, rooms):
+    """Derslikleri sınavın kapladığı slotlarda dolu işaretler"""
+    for key in keys:
+        state = _slot(index, key)
+        for r in rooms:
+            b = index['bit'].get(r['id'])
+            if b is None or state['busy'] >> b & 1: continue
+            state['busy'] |= 1 << b
+            state['used'][index['cluster_of'][b]] += index['caps'][b]
+
+def release(index, keys, rooms):
+    """Derslikleri sınavın kapladığı slotlarda yeniden boş işaretler"""
+    for key in keys:
+        state = _slot(index, key)
+        for r in rooms:
+            b = index['bit'].get(r['id'])
+            if b is None or not state['busy'] >> b & 1: continue
+            state['busy'] &= ~(1 << b)
+            state['used'][index['cluster_of'][b]] -= index['caps'][b]
+
+def free_mask(index, keys):
+    """Kaplanan slotların hepsinde boş olan derslikler"""
+    return index['all'] & ~_busy(index, keys)
+
+def is_free(index, keys, rooms):
+    """Derslikler kaplanan slotların hepsinde boş mu?"""
+    return not _busy(index, keys) & _mask(index, rooms)
+
+def smallest_free_room(index, keys, min_capacity):
+    """Kapasitesi >= min_capacity olan en küçük boş derslik (eşitlikte snapshot'ta önce gelen) ya da None"""
+    caps = index['caps']
+    start = bisect_left(caps, min_capacity)
+    free = free_mask(index, keys)
+    fits = free >> start
+    if not fits: return None
+    low = start + (fits & -fits).bit_length() - 1 # En küçük uygun kapasitenin ilk biti
+    end = bisect_right(caps, caps[low])
+    same = free & ((1 << end) - 1) # Aynı kapasitedekiler arasında en yüksek bit = snapshot'ta önce gelen
+    return index['rooms'][same.bit_length() - 1]
+
+def _rooms_of(index, mask):
+    rooms = []
+    while mask:
+        low = mask & -mask
+        rooms.append(low.bit_length() - 1)
+        mask ^= low
+    rooms.sort(key=index['rank'].__getitem__) # Snapshot sırası
+    return [index['rooms'][b] for b in rooms]
+
+def room_cluster(index, room_id):
+    """Dersliğin kümesi (yakınlık bileşeni) ya da None"""
+    b = index['bit'].get(room_id)
+    return None if b is None else index['cluster_of'][b]
+
+def free_rooms_in_cluster(index, keys, cluster_id):
+    """Kümedeki boş derslikler (snapshot sırasıyla)"""
+    return _rooms_of(index, free_mask(index, keys) & index['cluster_masks'][cluster_id])
+
+def free_rooms(index, keys, min_cluster_capacity=0):
+    """Boş derslikler (snapshot sırasıyla); boş kapasitesi min_cluster_capacity'ye yetmeyen kümeler hariç"""
+    states = [index['slots'][k] for k in keys if k in index['slots']]
+    mask = 0
+    for c_id, (c_mask, cap) in enumerate(zip(index['cluster_masks'], index['cluster_caps'])):
+        # Slot başına boş kapasitenin en küçüğü (birden çok slotta üst sınır; kesin kontrol derslik aramasında)
+        if cap - max((st['used'][c_id] for st in states), default=0) >= min_cluster_capacity:
+            mask |= c_mask
+    return _rooms_of(index, mask & free_mask(index, keys))
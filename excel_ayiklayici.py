@@ -1,7 +1,13 @@
 import pandas as pd
 import os
 import re
+import time
+import pickle
+import hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from olcumleme import observe
 
 # --- MANUEL DERS İSİM LİSTESİ (SABİT VERİ) ---
 DERS_ISIMLERI = {
@@ -33,71 +39,86 @@ DERS_ISIMLERI = {
     "SEC130": "İŞ SAĞLIĞI VE GÜVENLİĞİ",
 }
 
-def parse_student_list_excel(file_path):
-    students = []
-    course_code = None
-    
+# Öğrenci numarası: 7-15 haneli sayı (tüm hücre)
+OGRENCI_NO_DESENI = r'\d{7,15}'
+
+# Ayrıştırma önbelleği biçim sürümü (ayrıştırıcı değişirse artırılır, eski önbellek yok sayılır)
+ONBELLEK_SURUMU = 1
+
+def course_code_from_filename(file_path):
+    """Dosya adından ders kodunu bulur: [BLM101] > ABC123 > dosya adı"""
     filename = Path(file_path).name
-    # Kod Bulma
     match = re.search(r'\[(.*?)\]', filename)
     if match:
-        course_code = match.group(1)
-    else:
-        match_backup = re.search(r'([A-Z]{3}\d{3})', filename)
-        if match_backup:
-            course_code = match_backup.group(1)
-        else:
-            course_code = Path(file_path).stem
+        return match.group(1)
+    match_backup = re.search(r'([A-Z]{3}\d{3})', filename)
+    if match_backup:
+        return match_backup.group(1)
+    return Path(file_path).stem
+
+def _read_table(file_path):
+    if str(file_path).endswith('.csv'):
+        return pd.read_csv(file_path, sep=None, engine='python', header=None)
+    return pd.read_excel(file_path, header=None)
+
+def parse_student_frame(df, course_code):
+    """
+    Ham tablodan öğrenci listesini vektörel olarak çıkarır.
+    Öğrenci no sütunu TEK seferde (en çok eşleşen sütun) bulunur, sonra dilimlenir.
+    """
+    if df.empty:
+        return []
+    cells = df.astype(str).apply(lambda col: col.str.strip())
+    matches = cells.apply(lambda col: col.str.fullmatch(OGRENCI_NO_DESENI))
+    counts = matches.sum(axis=0)
+    if not counts.any():
+        return []
+
+    col_pos = int(counts.values.argmax())
+    rows = matches.iloc[:, col_pos].values
+    s_no = cells.iloc[rows, col_pos]
+    if col_pos + 1 >= cells.shape[1]:
+        return []
+
+    # İsim: yanındaki sütun (rakamsız ve > 3 karakter) ya da sonraki iki sütunun birleşimi
+    first = cells.iloc[rows, col_pos + 1]
+    name = first.where((first.str.len() > 3) & ~first.str.contains(r'\d'))
+    if col_pos + 2 < cells.shape[1]:
+        second = cells.iloc[rows, col_pos + 2]
+        name = name.fillna((first + ' ' + second).where(second.str.len() > 2))
+
+    valid = name.notna() & ~name.fillna('').str.lower().str.contains('unnamed')
+    return [
+        {'student_no': no, 'name': nm, 'course_code': course_code}
+        for no, nm in zip(s_no[valid].tolist(), name[valid].tolist())
+    ]
+
+def parse_student_list_excel(file_path):
+    course_code = course_code_from_filename(file_path)
+    filename = Path(file_path).name
+    students = []
 
     try:
-        if file_path.endswith('.csv'):
-            df = pd.read_csv(file_path, sep=None, engine='python', header=None)
-        else:
-            df = pd.read_excel(file_path, header=None)
-
-        for index, row in df.iterrows():
-            row_vals = [str(x).strip() for x in row.values]
-            s_no = None
-            s_name = None
-            
-            for i, val in enumerate(row_vals):
-                if re.match(r'^\d{7,15}$', val):
-                    s_no = val
-                    if i + 1 < len(row_vals):
-                        possible_name = row_vals[i+1]
-                        if len(possible_name) > 3 and not any(char.isdigit() for char in possible_name):
-                            s_name = possible_name
-                        elif i + 2 < len(row_vals):
-                             next_val = row_vals[i+2]
-                             if len(next_val) > 2:
-                                 s_name = f"{possible_name} {next_val}"
-
-                    if s_no and s_name and "unnamed" not in s_name.lower():
-                        students.append({
-                            'student_no': s_no,
-                            'name': s_name,
-                            'course_code': course_code
-                        })
-                        break
+        students = parse_student_frame(_read_table(file_path), course_code)
     except Exception as e:
         print(f"❌ Hata ({filename}): {e}")
 
+    return students, course_code, course_name(course_code)
+
+def course_name(course_code):
     # Manuel listeden ismi çek
-    final_name = DERS_ISIMLERI.get(course_code, f"{course_code} Dersi")
-    
-    return students, course_code, final_name
+    return DERS_ISIMLERI.get(course_code, f"{course_code} Dersi")
 
 def parse_capacities(file_path):
     capacities = {}
     try:
         df = pd.read_excel(file_path)
-        for idx, row in df.iterrows():
-            if len(row) >= 2:
-                name = str(row.iloc[0]).strip()
-                try:
-                    cap = int(row.iloc[1])
-                    capacities[name] = cap
-                except: continue
+        if df.shape[1] >= 2:
+            names = df.iloc[:, 0].astype(str).str.strip()
+            caps = pd.to_numeric(df.iloc[:, 1], errors='coerce')
+            valid = caps.notna()
+            capacities = dict(zip(names[valid], caps[valid].astype(int)))
+            capacities = {k: int(v) for k, v in capacities.items()}
     except: pass
     return capacities
 
@@ -106,66 +127,215 @@ def parse_proximity_list(file_path):
     tum_derslikler = set()
     try:
         df = pd.read_excel(file_path)
-        for idx, row in df.iterrows():
-            cols = [str(c).strip() for c in row.values if pd.notna(c)]
-            if len(cols) < 2: continue
-            main_room = cols[0]
-            tum_derslikler.add(main_room)
-            nearby_list = re.split(r'[,;]', cols[1])
-            for neighbor in nearby_list:
-                neighbor = neighbor.strip()
-                if neighbor and neighbor != main_room and len(neighbor) < 20:
-                    proximity_data.append({'classroom1': main_room, 'classroom2': neighbor})
-                    tum_derslikler.add(neighbor)
+        # Her satırın boş olmayan ilk iki hücresi: ana derslik ve yakın derslik listesi
+        stacked = df.stack().astype(str).str.strip()
+        position = stacked.groupby(level=0).cumcount()
+        main = stacked[position == 0].droplevel(1)
+        nearby = stacked[position == 1].droplevel(1)
+        main = main[main.index.isin(nearby.index)]
+        tum_derslikler.update(main.tolist())
+
+        pairs = nearby.str.split(r'[,;]', regex=True).explode().str.strip().to_frame('classroom2')
+        pairs['classroom1'] = main.reindex(pairs.index)
+        pairs = pairs[(pairs['classroom2'] != '') & (pairs['classroom2'] != pairs['classroom1'])
+                      & (pairs['classroom2'].str.len() < 20)]
+        proximity_data = pairs[['classroom1', 'classroom2']].to_dict('records')
+        tum_derslikler.update(pairs['classroom2'].tolist())
     except: pass
     return proximity_data, tum_derslikler
 
-def import_all_data(folder_path):
+def roster_files(folder_path):
+    """Sınıf listesi dosyaları (sıralı, geçici ~ dosyaları hariç)"""
+    return [f for f in sorted(Path(folder_path).glob("SınıfListesi*")) if not f.name.startswith('~')]
+
+# İşçi başına aynı anda gönderilen dosya: bellekte en fazla (işçi x bu sayı) ayrıştırılmış liste bekler
+ISCI_BASINA_DOSYA = 2
+
+def _bounded_map(pool, fn, items, in_flight):
+    """pool.map gibi sırayı korur, ama işleri baştan göndermez: en fazla in_flight iş havada/bekleyen sonuç olur"""
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def _parse_timed(file_path):
+    """İşçi süreçte tek dosya: (öğrenciler, kod, ad, dosya, süre)"""
+    start = time.perf_counter()
+    st, code, name = parse_student_list_excel(str(file_path))
+    return st, code, name, file_path, time.perf_counter() - start
+
+def load_roster_cache(cache_path):
+    """Diskteki ayrıştırma önbelleğini okur: {dosya yolu: {size, mtime, sha1, code, students}}"""
+    try:
+        with open(cache_path, 'rb') as fh:
+            data = pickle.load(fh)
+        if data.get('version') == ONBELLEK_SURUMU:
+            return data['files']
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, KeyError):
+        pass
+    return {}
+
+def save_roster_cache(cache_path, cache):
+    """Önbelleği geçici dosyaya yazıp yerine taşır (yarım yazılmış dosya kalmaz)"""
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp" # Aynı anda yazan süreçler çakışmasın
+    with open(tmp_path, 'wb') as fh:
+        pickle.dump({'version': ONBELLEK_SURUMU, 'files': cache}, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+
+def _file_hash(file_path):
+    return hashlib.sha1(Path(file_path).read_bytes()).hexdigest()
+
+def _cache_lookup(cache, file_path):
+    """
+    Dosya değişmediyse önbellek kaydını döner, değiştiyse None.
+    Boyut + mtime aynıysa dosya hiç okunmaz; yalnız mtime değiştiyse içerik hash'i karşılaştırılır.
+    """
+    entry = cache.get(str(file_path))
+    if entry is None:
+        return None
+    stat = os.stat(file_path)
+    if entry['size'] != stat.st_size:
+        return None
+    if entry['mtime'] != stat.st_mtime_ns:
+        if entry['sha1'] != _file_hash(file_path):
+            return None
+        entry['mtime'] = stat.st_mtime_ns # Dokunulmuş ama içerik aynı
+    return entry
+
+def _cache_store(cache, file_path, st, code):
+    stat = os.stat(file_path)
+    cache[str(file_path)] = {
+        'size': stat.st_size,
+        'mtime': stat.st_mtime_ns,
+        'sha1': _file_hash(file_path),
+        'code': code,
+        'students': list(st), # Birleştirme listeyi genişletir; önbellekte kopyası tutulur
+    }
+
+def effective_workers(workers, jobs):
+    """Gerçekte açılan süreç sayısı: en az 1, ayrıştırılacak dosya sayısından fazla değil"""
+    return max(1, min(int(workers or 1), jobs or 1))
+
+def iter_student_lists(folder_path, workers=1, cache=None):
+    """
+    Sınıf listelerini dosya dosya okuyup (öğrenciler, ders kodu, ders adı, dosya, süre, önbellekten mi) olarak üretir.
+    workers > 1 ise dosyalar süreç havuzunda paralel okunur; sonuçlar yine dosya sırasıyla gelir ve
+    havuza aynı anda en fazla workers x ISCI_BASINA_DOSYA dosya gönderilir (bellek dosya sayısıyla büyümez).
+    cache (load_roster_cache sözlüğü) verilirse değişmemiş dosyalar hiç ayrıştırılmaz, yenileri önbelleğe eklenir.
+    """
+    files = roster_files(folder_path)
+    hits = {}
+    if cache is not None:
+        for f in files:
+            entry = _cache_lookup(cache, f)
+            if entry is not None:
+                hits[f] = entry
+        # Silinen dosyaların kayıtlarını at
+        present = {str(f) for f in files}
+        for key in [k for k in cache if k not in present]:
+            del cache[key]
+
+    misses = [f for f in files if f not in hits]
+    workers = effective_workers(workers, len(misses))
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        # Sıra korunur (birleştirme her çalıştırmada aynı sonucu verir); havadaki iş sayısı sınırlı (akış)
+        parsed = _bounded_map(pool, _parse_timed, misses, workers * ISCI_BASINA_DOSYA) if pool else map(_parse_timed, misses)
+        for f in files:
+            if f in hits:
+                entry = hits[f]
+                yield list(entry['students']), entry['code'], course_name(entry['code']), f, 0.0, True
+                continue
+            st, code, name, f, elapsed = next(parsed)
+            if cache is not None and st:
+                _cache_store(cache, f, st, code)
+            yield st, code, name, f, elapsed, False
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+
+def merge_student_list(all_students, st, code, name):
+    """Bir dosyanın listesini ders koduna göre birleştirir (aynı kod tekrar gelirse mükerrerleri atlar)"""
+    if not (st and code): return
+    if code in all_students:
+        # --- MÜKERRER KAYIT KONTROLÜ ---
+        existing_ids = all_students[code]['ids']
+        
+        added_count = 0
+        for student in st:
+            # Eğer bu öğrenci numarası listede YOKSA ekle
+            if student['student_no'] not in existing_ids:
+                all_students[code]['students'].append(student)
+                existing_ids.add(student['student_no'])
+                added_count += 1
+        
+        print(f"  ➕ {code}: {added_count} YENİ kişi eklendi. (Mükerrer kayıtlar atlandı)")
+        
+        # İsmi de güncelle
+        all_students[code]['name'] = name
+    else:
+        all_students[code] = {
+            'students': st,
+            'name': name,
+            'ids': set(s['student_no'] for s in st),
+        }
+        print(f"  ✅ {code}: {len(st)} kişi oluşturuldu. (Ders: {name})")
+
+def import_all_data(folder_path, workers=1, report=None, cache_path=None):
+    """
+    Klasördeki tüm verileri okur. workers: paralel okuma süreç sayısı.
+    report verilirse (dict) dosya başına süreler ve toplamlar içine yazılır.
+    cache_path verilirse ayrıştırılmış listeler bu dosyada saklanır; değişmeyen dosyalar atlanır.
+    """
     all_students = {}
     proximity_data = []
     tum_derslikler = set()
     room_capacities = {}
+    start = time.perf_counter()
     
     folder = Path(folder_path)
     cap_files = list(folder.glob("*kapasite*"))
     if cap_files: room_capacities = parse_capacities(str(cap_files[0]))
     
-    files = list(folder.glob("SınıfListesi*"))
-    print(f"📂 {len(files)} sınıf listesi taranıyor...")
+    print(f"📂 {len(roster_files(folder))} sınıf listesi taranıyor... ({workers} işçi)")
+    cache = load_roster_cache(cache_path) if cache_path else None
     
-    for f in files:
-        if f.name.startswith('~'): continue
-        
-        st, code, name = parse_student_list_excel(str(f))
-        
-        if st and code:
-            if code in all_students:
-                # --- MÜKERRER KAYIT KONTROLÜ (YENİ KISIM) ---
-                # Mevcut öğrencilerin numaralarını bir kümeye al
-                existing_ids = set(s['student_no'] for s in all_students[code]['students'])
-                
-                added_count = 0
-                for student in st:
-                    # Eğer bu öğrenci numarası listede YOKSA ekle
-                    if student['student_no'] not in existing_ids:
-                        all_students[code]['students'].append(student)
-                        added_count += 1
-                
-                print(f"  ➕ {code}: {added_count} YENİ kişi eklendi. (Mükerrer kayıtlar atlandı)")
-                
-                # İsmi de güncelle
-                all_students[code]['name'] = name
-            else:
-                all_students[code] = {
-                    'students': st,
-                    'name': name
-                }
-                print(f"  ✅ {code}: {len(st)} kişi oluşturuldu. (Ders: {name})")
+    file_times = []
+    merge_seconds = 0.0
+    for st, code, name, f, elapsed, cached in iter_student_lists(folder, workers, cache):
+        file_times.append({'file': f.name, 'code': code, 'students': len(st), 'seconds': round(elapsed, 3), 'cached': cached})
+        print(f"  {'💾' if cached else '⏱'} {f.name}: {len(st)} kişi, {'önbellekten' if cached else f'{elapsed:.2f} sn'}")
+        if not cached:
+            observe('aktarim_asama_saniye', elapsed, asama='dosya_ayristirma') # İşçi süreçte ölçülen süre
+        merge_start = time.perf_counter()
+        merge_student_list(all_students, st, code, name)
+        merge_seconds += time.perf_counter() - merge_start
+    observe('aktarim_asama_saniye', merge_seconds, asama='birlestirme')
+
+    if cache is not None:
+        save_roster_cache(cache_path, cache)
+
+    for data in all_students.values():
+        data.pop('ids', None)
             
+    prox_start = time.perf_counter()
     prox_files = list(folder.glob("*Yakınlık*"))
     if prox_files:
         p_data, rooms = parse_proximity_list(str(prox_files[0]))
         proximity_data = p_data
         tum_derslikler.update(rooms)
+    observe('aktarim_asama_saniye', time.perf_counter() - prox_start, asama='yakinlik')
+
+    observe('aktarim_asama_saniye', time.perf_counter() - start, asama='okuma_toplam')
+    if report is not None:
+        # İstenen değil, fiilen kullanılan işçi sayısı (tek/önbellekten gelen dosyalarda 1)
+        report['workers'] = effective_workers(workers, sum(1 for ft in file_times if not ft['cached']))
+        report['files'] = file_times
+        report['parse_seconds'] = round(sum(ft['seconds'] for ft in file_times), 3)
+        report['cached'] = sum(1 for ft in file_times if ft['cached'])
+        report['total_seconds'] = round(time.perf_counter() - start, 3)
     
     return all_students, proximity_data, tum_derslikler, room_capacities
\ No newline at end of file
@@ -0,0 +1,141 @@
+"""
+İndeks ölçümü: sıcak sorguların indekssiz / indeksli süreleri
+Geçici bir SQLite veritabanında sentetik büyük veri üretir, sorguları önce
+indeksler kaldırılmış halde, sonra göçler (veritabani_gocleri.migrate) uygulanmış
+halde ölçer ve sonucu tablo + JSON olarak yazar.
+Kullanım: python indeks_olcumu.py [--students 30000] [--courses 400] [--repeat 300] [--out indeks_olcumu.json]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import date, time as dtime, timedelta
+from flask import Flask
+from sqlalchemy import insert, or_
+from modeller import db, Course, CourseStudent, Classroom, ClassroomProximity, ExamSchedule, InstructorAvailability, User
+from veritabani_gocleri import migrate, drop_declared_indexes
+
+def _app(db_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+def generate_data(students, courses, per_student, seed=0):
+    """Sentetik veri: derslik, hoca, ders, kayıt, program ve müsaitlik satırları"""
+    rng = random.Random(seed)
+    teachers = max(courses // 8, 1)
+    rooms = max(courses // 2, 10)
+    db.session.execute(insert(User), [
+        {'username': f'hoca{i}', 'email': f'hoca{i}@x', 'password_hash': '-', 'role': 'teacher', 'name': f'Hoca {i}'}
+        for i in range(teachers)])
+    db.session.execute(insert(Classroom), [{'name': f'D{i}', 'capacity': rng.choice([40, 60, 90])} for i in range(rooms)])
+    db.session.execute(insert(Course), [
+        {'code': f'DRS{i:04d}', 'name': f'Ders {i}', 'instructor_id': 1 + i % teachers} for i in range(courses)])
+    db.session.execute(insert(CourseStudent), [
+        {'course_id': c_id, 'student_no': f'{2300000000 + s}', 'student_name': f'Ogrenci {s}'}
+        for s in range(students) for c_id in rng.sample(range(1, courses + 1), per_student)])
+    db.session.execute(insert(ClassroomProximity), [
+        {'classroom1_id': r, 'classroom2_id': rng.randint(1, rooms)} for r in range(1, rooms + 1) for _ in range(3)])
+    days = [date(2026, 1, 5) + timedelta(days=d) for d in range(10)]
+    slots = [dtime(h, 0) for h in (9, 11, 13, 15, 17)]
+    db.session.execute(insert(ExamSchedule), [
+        {'course_id': c_id, 'classroom_id': rng.randint(1, rooms), 'teacher_id': 1 + c_id % teachers,
+         'exam_date': rng.choice(days), 'start_time': rng.choice(slots), 'end_time': dtime(18, 0)}
+        for c_id in range(1, courses + 1)])
+    db.session.execute(insert(InstructorAvailability), [
+        {'course_id': c_id, 'day_of_week': d, 'start_time': dtime(9, 0), 'end_time': dtime(12, 0)}
+        for c_id in range(1, courses + 1) for d in rng.sample(range(5), 2)])
+    db.session.commit()
+    return {'students': students, 'courses': courses, 'enrolments': students * per_student,
+            'teachers': teachers, 'classrooms': rooms, 'days': days, 'slots': slots}
+
+def hot_queries(info):
+    """(ad, parametre üretici, sorgu) - uygulamadaki sıcak aramaların karşılıkları"""
+    s, c, t, r = info['students'], info['courses'], info['teachers'], info['classrooms']
+    return [
+        ('ogrenci_dersleri', lambda rng: f'{2300000000 + rng.randrange(s)}',
+         lambda no: db.session.query(CourseStudent.course_id).filter(CourseStudent.student_no == no).all()),
+        ('ders_listesi', lambda rng: rng.randint(1, c),
+         lambda c_id: db.session.query(CourseStudent.student_no).filter(CourseStudent.course_id == c_id).all()),
+        ('kayit_var_mi', lambda rng: (rng.randint(1, c), f'{2300000000 + rng.randrange(s)}'),
+         lambda p: CourseStudent.query.filter_by(course_id=p[0], student_no=p[1]).first()),
+        ('ders_sinavi', lambda rng: rng.randint(1, c),
+         lambda c_id: ExamSchedule.query.filter_by(course_id=c_id).all()),
+        ('oturum_sinavlari', lambda rng: (rng.choice(info['days']), rng.choice(info['slots'])),
+         lambda p: ExamSchedule.query.filter_by(exam_date=p[0], start_time=p[1]).all()),
+        ('hoca_sinavlari', lambda rng: rng.randint(1, t),
+         lambda t_id: ExamSchedule.query.filter_by(teacher_id=t_id).all()),
+        ('hoca_musaitligi', lambda rng: rng.randint(1, c),
+         lambda c_id: InstructorAvailability.query.filter_by(course_id=c_id).all()),
+        ('derslik_yakinligi', lambda rng: rng.randint(1, r),
+         lambda r_id: ClassroomProximity.query.filter(or_(ClassroomProximity.classroom1_id == r_id,
+                                                          ClassroomProximity.classroom2_id == r_id)).all()),
+    ]
+
+def measure(queries, repeat, seed=1):
+    """Her sorgu için ortalama süre (ms)"""
+    results = {}
+    for name, make_param, run in queries:
+        rng = random.Random(seed)
+        params = [make_param(rng) for _ in range(repeat)]
+        start = time.perf_counter()
+        for p in params:
+            run(p)
+        results[name] = round((time.perf_counter() - start) * 1000 / repeat, 4)
+        db.session.rollback()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Sıcak sorgular için indeksli/indekssiz süre ölçümü')
+    parser.add_argument('--students', type=int, default=30000)
+    parser.add_argument('--courses', type=int, default=400)
+    parser.add_argument('--per-student', type=int, default=6)
+    parser.add_argument('--repeat', type=int, default=300)
+    parser.add_argument('--out', default='indeks_olcumu.json')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = _app(os.path.join(tmp, 'olcum.db'))
+        with app.app_context():
+            db.create_all()
+            t0 = time.perf_counter()
+            info = generate_data(args.students, args.courses, args.per_student)
+            print(f"🧪 {info['enrolments']} kayıt, {info['courses']} ders üretildi ({time.perf_counter() - t0:.1f} sn)")
+
+            # Önce: indeksler kaldırılmış (eski şema)
+            drop_declared_indexes()
+            db.session.commit()
+            queries = hot_queries(info)
+            before = measure(queries, args.repeat)
+
+            # Sonra: göçler uygulanmış
+            t0 = time.perf_counter()
+            migrate()
+            migrate_seconds = round(time.perf_counter() - t0, 3)
+            after = measure(queries, args.repeat)
+            db.session.remove()
+            db.engine.dispose()
+
+    print(f"\n{'sorgu':<20}{'önce (ms)':>12}{'sonra (ms)':>12}{'hızlanma':>10}")
+    for name in before:
+        speedup = before[name] / after[name] if after[name] else 0
+        print(f"{name:<20}{before[name]:>12.3f}{after[name]:>12.3f}{speedup:>9.1f}x")
+    print(f"\n🛠️ Göç süresi: {migrate_seconds} sn")
+
+    result = {
+        'params': {k: v for k, v in vars(args).items() if k != 'out'},
+        'rows': {k: v for k, v in info.items() if k not in ('days', 'slots')},
+        'migrate_seconds': migrate_seconds,
+        'before_ms': before,
+        'after_ms': after,
+    }
+    with open(args.out, 'w', encoding='utf-8') as fh:
+        json.dump(result, fh, ensure_ascii=False, indent=2)
+    print(f"💾 Sonuç: {args.out}")
+
+if __name__ == '__main__':
+    main()
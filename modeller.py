@@ -64,9 +64,12 @@ class CourseStudent(db.Model):
     __tablename__ = 'course_students'
     id = db.Column(db.Integer, primary_key=True)
     course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
-    student_no = db.Column(db.String(20), nullable=False)
+    student_no = db.Column(db.String(20), nullable=False, index=True)
     student_name = db.Column(db.String(100))
 
+    # Bir öğrenci bir derse bir kez kaydolur (course_id ile aramaları da karşılar)
+    __table_args__ = (db.Index('uq_course_students_course_student', 'course_id', 'student_no', unique=True),)
+
 class Classroom(db.Model):
     __tablename__ = 'classrooms'
     id = db.Column(db.Integer, primary_key=True)
@@ -79,14 +82,16 @@ class ClassroomProximity(db.Model):
     __tablename__ = 'classroom_proximities'
     id = db.Column(db.Integer, primary_key=True)
     classroom1_id = db.Column(db.Integer, db.ForeignKey('classrooms.id'), nullable=False)
-    classroom2_id = db.Column(db.Integer, db.ForeignKey('classrooms.id'), nullable=False)
+    classroom2_id = db.Column(db.Integer, db.ForeignKey('classrooms.id'), nullable=False, index=True)
+
+    __table_args__ = (db.Index('ix_classroom_proximities_pair', 'classroom1_id', 'classroom2_id'),)
 
 class ExamSchedule(db.Model):
     __tablename__ = 'exam_schedules'
     id = db.Column(db.Integer, primary_key=True)
-    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False, index=True)
     classroom_id = db.Column(db.Integer, db.ForeignKey('classrooms.id'), nullable=False)
-    teacher_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    teacher_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
     exam_date = db.Column(db.Date, nullable=False)
     start_time = db.Column(db.Time, nullable=False)
     end_time = db.Column(db.Time, nullable=False)
@@ -100,11 +105,56 @@ class ExamSchedule(db.Model):
 
     # ÖNEMLİ: UniqueConstraint KALDIRILDI!
     # Artık aynı sınıfa aynı saatte birden fazla ders atanabilir (Ortak Sınav İçin)
+    __table_args__ = (db.Index('ix_exam_schedules_slot', 'exam_date', 'start_time'),)
 
 class InstructorAvailability(db.Model):
     __tablename__ = 'instructor_availability'
     id = db.Column(db.Integer, primary_key=True)
-    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False, index=True)
     day_of_week = db.Column(db.Integer, nullable=False) # 0=Pazartesi, 6=Pazar
     start_time = db.Column(db.Time, nullable=False)
-    end_time = db.Column(db.Time, nullable=False)
\ No newline at end of file
+    end_time = db.Column(db.Time, nullable=False)
+
+class PlanningJob(db.Model):
+    __tablename__ = 'planning_jobs'
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default='pending') # 'pending', 'running', 'done', 'failed', 'cancelled'
+    params = db.Column(db.Text) # JSON: engine, time_limit, improve_time...
+    placed = db.Column(db.Integer, default=0) # Şu ana kadar yerleşen grup
+    processed = db.Column(db.Integer, default=0)
+    total = db.Column(db.Integer, default=0)
+    cancel_requested = db.Column(db.Boolean, default=False)
+    result = db.Column(db.Text) # JSON: generate_exam_schedule sonucu
+    error = db.Column(db.String(500))
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime) # Çalışan işçi her ilerleme yazışında günceller
+
+class ScheduleVersion(db.Model):
+    __tablename__ = 'schedule_versions'
+    id = db.Column(db.Integer, primary_key=True) # Tek satır (id=1)
+    version = db.Column(db.Integer, nullable=False, default=0) # Program her değiştiğinde artar
+    updated_at = db.Column(db.DateTime, default=datetime.now)
+
+class StudentTimetable(db.Model):
+    __tablename__ = 'student_timetables'
+    student_no = db.Column(db.String(20), primary_key=True) # Öğrenci başına tek satır (indeksli arama)
+    version = db.Column(db.Integer, nullable=False) # Üretildiği program sürümü
+    exams = db.Column(db.Text, nullable=False) # JSON: öğrencinin gruplanmış sınav listesi
+
+class ExamPeriod(db.Model):
+    __tablename__ = 'exam_periods'
+    id = db.Column(db.Integer, primary_key=True)
+    term = db.Column(db.String(50), nullable=False) # Dönem (ör. '2025-2026 Güz')
+    exam_date = db.Column(db.Date, nullable=False)
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)
+
+    __table_args__ = (db.UniqueConstraint('term', 'exam_date', 'start_time', name='uq_exam_periods_term_slot'),)
+
+class SchemaMigration(db.Model):
+    __tablename__ = 'schema_migrations'
+    id = db.Column(db.String(100), primary_key=True) # Göç adı (ör. '001_ders_kaydi_tekil')
+    applied_at = db.Column(db.DateTime, default=datetime.now)
\ No newline at end of file
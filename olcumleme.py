@@ -0,0 +1,157 @@
+"""
+Ölçümleme (metrikler)
+Planlama aşamaları, içe aktarma aşamaları, çıktı üretimi ve HTTP istekleri için süre
+histogramları ve sayaçlar süreç belleğinde tutulur; /admin/metrics bunları Prometheus
+metin biçiminde yayınlar. Ayarlar ortam değişkenlerinden (ya da .env) okunur:
+  METRICS_ENABLED   0 ise ölçüm kapalı: timer() boş bağlam döner, observe/inc hemen döner
+  METRICS_LOG       1 ise her süre gözlemi ayrıca tek satır JSON olarak loglanır (logger 'metrikler')
+Çok işçili sunucuda her süreç kendi değerlerini tutar (her işçi ayrı kazınır).
+"""
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from dotenv import load_dotenv
+
+# Süre histogramı kova sınırları (sn)
+SURE_KOVALARI = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+ACIKLAMALAR = {
+    'planlama_asama_saniye': 'Planlama aşama süreleri (snapshot, arama, kayit, derslik_arama)',
+    'planlama_toplam': 'Planlama çalıştırmaları (motor ve sonuca göre)',
+    'planlama_cakisma_kontrolu_toplam': 'Açgözlü planlamadaki çakışma kontrolleri',
+    'planlama_derslik_arama_toplam': 'Açgözlü planlamadaki derslik aramaları',
+    'planlama_sql_toplam': 'Planlama aşamalarında çalışan SQL ifadeleri',
+    'aktarim_asama_saniye': 'İçe aktarma aşama süreleri',
+    'aktarim_satir_toplam': 'İçe aktarmada yazılan satırlar (tabloya göre)',
+    'cikti_uretim_saniye': 'PDF/Excel çıktı üretim süreleri',
+    'cikti_onbellek_toplam': 'Çıktı isteklerinde hazır dosya isabeti / yeni üretim',
+    'http_istek_saniye': 'HTTP istek süreleri (rota, yöntem, durum)',
+    'http_istek_sql_toplam': 'HTTP isteklerinde çalışan SQL ifadeleri (rotaya göre)',
+}
+
+AYAR = {'enabled': True, 'log': False}
+log = logging.getLogger('metrikler')
+
+_kilit = threading.Lock()
+_histogramlar = {} # (ad, etiketler) -> {'buckets': [kova başına adet], 'sum': .., 'count': ..}
+_sayaclar = {} # (ad, etiketler) -> değer
+_KAPALI = nullcontext()
+
+def configure(enabled=None, log_events=None):
+    """Ölçümü açar/kapatır; verilmeyen ayar ortamdan okunur"""
+    load_dotenv()
+    AYAR['enabled'] = os.environ.get('METRICS_ENABLED', '1') != '0' if enabled is None else bool(enabled)
+    AYAR['log'] = os.environ.get('METRICS_LOG', '0') == '1' if log_events is None else bool(log_events)
+    if AYAR['log'] and not log.handlers:
+        log.addHandler(logging.StreamHandler())
+        log.setLevel(logging.INFO)
+
+def enabled():
+    return AYAR['enabled']
+
+def reset():
+    with _kilit:
+        _histogramlar.clear()
+        _sayaclar.clear()
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def observe(name, seconds, **labels):
+    """Süre gözlemi (histogram)"""
+    if not AYAR['enabled']: return
+    key = _key(name, labels)
+    with _kilit:
+        hist = _histogramlar.get(key)
+        if hist is None:
+            hist = _histogramlar[key] = {'buckets': [0] * len(SURE_KOVALARI), 'sum': 0.0, 'count': 0}
+        i = bisect_left(SURE_KOVALARI, seconds)
+        if i < len(SURE_KOVALARI):
+            hist['buckets'][i] += 1
+        hist['sum'] += seconds
+        hist['count'] += 1
+    if AYAR['log']:
+        log.info(json.dumps({'metric': name, 'seconds': round(seconds, 6), **labels}, ensure_ascii=False, default=str))
+
+def inc(name, value=1, **labels):
+    """Sayaç artırma"""
+    if not AYAR['enabled'] or not value: return
+    key = _key(name, labels)
+    with _kilit:
+        _sayaclar[key] = _sayaclar.get(key, 0) + value
+
+@contextmanager
+def _timer(name, labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+def timer(name, **labels):
+    """with timer('ad', etiket=..): ... - blok süresini gözlemler; ölçüm kapalıyken boş bağlam"""
+    if not AYAR['enabled']: return _KAPALI
+    return _timer(name, labels)
+
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items: return ''
+    escape = lambda v: v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in items) + '}'
+
+def prometheus_text():
+    """Tüm metrikler, Prometheus metin biçimi (0.0.4)"""
+    with _kilit:
+        hists = {key: {'buckets': list(h['buckets']), 'sum': h['sum'], 'count': h['count']} for key, h in _histogramlar.items()}
+        counters = dict(_sayaclar)
+    lines = []
+    for kind, series in (('counter', counters), ('histogram', hists)):
+        for name in sorted({key[0] for key in series}):
+            if name in ACIKLAMALAR:
+                lines.append(f'# HELP {name} {ACIKLAMALAR[name]}')
+            lines.append(f'# TYPE {name} {kind}')
+            for (s_name, labels), value in sorted(series.items()):
+                if s_name != name: continue
+                if kind == 'counter':
+                    lines.append(f'{name}{_format_labels(labels)} {value}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(SURE_KOVALARI, value['buckets']):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_format_labels(labels, [("le", str(bound))])} {cumulative}')
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {value["count"]}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {value["sum"]:.6f}')
+                lines.append(f'{name}_count{_format_labels(labels)} {value["count"]}')
+    return '\n'.join(lines) + '\n'
+
+def init_app(app):
+    """İstek başına süre ve SQL sayısını ölçer (ölçüm kapalıysa hiçbir kanca eklenmez)"""
+    configure()
+    if not AYAR['enabled']: return
+    from flask import g, request, has_request_context
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _istek_sql(conn, cursor, statement, parameters, context, executemany):
+        # Arka plan planlama thread'leri istek bağlamı dışında: sayılmaz
+        if has_request_context():
+            g.metrik_sql = g.get('metrik_sql', 0) + 1
+
+    @app.before_request
+    def _istek_basla():
+        g.metrik_basla = time.perf_counter()
+        g.metrik_sql = 0
+
+    @app.after_request
+    def _istek_bitir(response):
+        start = g.pop('metrik_basla', None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule else 'eslesmeyen'
+            observe('http_istek_saniye', time.perf_counter() - start, route=route, method=request.method, status=response.status_code)
+            inc('http_istek_sql_toplam', g.pop('metrik_sql', 0), route=route)
+        return response
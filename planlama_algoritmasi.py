@@ -1,173 +1,368 @@
-from modeller import db, Course, Classroom, ExamSchedule, CourseStudent, ClassroomProximity, InstructorAvailability
-from datetime import datetime, date, time, timedelta
+from modeller import db, ExamSchedule
+from planlama_verisi import load_planning_snapshot, sql_sayaci, popcount
+from program_onbellegi import bump_schedule_version
+from olcumleme import timer, observe, inc
+from derslik_indeksi import build_room_index, occupy, smallest_free_room, free_rooms
+from sinav_takvimi import snapshot_calendar, covered_slots
+from datetime import datetime, timedelta
 import random
+from time import perf_counter
 
-# Sınav Takvimi
-SINAV_GUNLERI = [
-    date(2026, 1, 5), date(2026, 1, 6), date(2026, 1, 7), 
-    date(2026, 1, 8), date(2026, 1, 9), 
-    date(2026, 1, 12), date(2026, 1, 13), date(2026, 1, 14),
-    date(2026, 1, 15), date(2026, 1, 16)
-]
-SINAV_SAATLERI = [time(9, 0), time(11, 0), time(13, 0), time(15, 0), time(17, 0)]
-
-def get_student_ids_for_course_list(course_list):
-    """Bir ders GRUBUNDAKİ tüm öğrencilerin ID kümesini döner"""
-    all_students = set()
-    for course in course_list:
-        students = db.session.query(CourseStudent.student_no).filter_by(course_id=course.id).all()
-        for s in students:
-            all_students.add(s[0])
-    return all_students
-
-def check_conflict(student_set, exam_date, start_time, schedule_memory):
-    """Çakışma Kontrolü"""
-    for item in schedule_memory:
-        if item['date'] == exam_date and item['time'] == start_time:
-            # Kesişim var mı? (Ortak öğrenci var mı?)
-            if student_set.intersection(item['students']):
-                return True
-    return False
-
-def generate_exam_schedule():
-    """Ana Planlama Fonksiyonu - GRUPLU VE ORTAK SINAV DESTEKLİ"""
+# Sınav takvimi (günler/oturumlar) dönem bazlı veridir: bkz. sinav_takvimi
+
+class PlanlamaIptal(Exception):
+    """Planlama kullanıcı tarafından iptal edildi (progress callback'i fırlatır)"""
+    pass
+
+def build_conflict_graph(group_bits):
+    """Grup -> {çakışan grup: ortak öğrenci sayısı} çakışma grafını bir kez kurar"""
+    conflict_graph = [{} for _ in group_bits]
+    for i, bits_i in enumerate(group_bits):
+        if not bits_i: continue
+        neighbours = conflict_graph[i]
+        for j in range(i + 1, len(group_bits)):
+            # Ortak öğrenci = bitsetlerin kesişimi (bitwise AND)
+            shared = bits_i & group_bits[j]
+            if shared:
+                count = popcount(shared)
+                neighbours[j] = count
+                conflict_graph[j][i] = count
+    return conflict_graph
+
+def snapshot_conflict_graph(snapshot):
+    """Snapshot başına bir kez kurulan çakışma grafı (snapshot içinde saklanır)"""
+    if 'conflict_graph' not in snapshot:
+        snapshot['conflict_graph'] = build_conflict_graph([g['student_bits'] for g in snapshot['groups']])
+    return snapshot['conflict_graph']
+
+def build_conflict_masks(conflict_graph):
+    """Her grup için çakıştığı grupların bit maskesi (bit j = grup j)"""
+    masks = []
+    for neighbours in conflict_graph:
+        mask = 0
+        for j in neighbours:
+            mask |= 1 << j
+        masks.append(mask)
+    return masks
+
+def check_conflict(g_idx, span, conflict_masks, slot_masks):
+    """Çakışma Kontrolü: Sınavın kapladığı slotlara yerleşmiş gruplardan biriyle ortak öğrenci var mı?"""
+    mask = conflict_masks[g_idx]
+    return any(mask & slot_masks[t] for t in span)
+
+def _is_connected(rooms, proximity):
+    """Seçilen derslikler yakınlık grafında tek parça mı?"""
+    ids = {r['id'] for r in rooms}
+    stack = [rooms[0]['id']]
+    seen = {rooms[0]['id']}
+    while stack:
+        for n in proximity.get(stack.pop(), ()):
+            if n in ids and n not in seen:
+                seen.add(n)
+                stack.append(n)
+    return len(seen) == len(ids)
+
+def _grow_cluster(seed, free_by_id, required_cap, proximity):
+    """Seed dersliğinden başlayıp komşulara yayılarak kapasiteyi doldurur"""
+    chosen = [seed]
+    chosen_ids = {seed['id']}
+    current_cap = seed['capacity']
+    frontier = set(proximity.get(seed['id'], ())) & free_by_id.keys()
+
+    while current_cap < required_cap:
+        frontier -= chosen_ids
+        if not frontier: return None
+        candidates = [free_by_id[i] for i in frontier]
+        gap = required_cap - current_cap
+        # Açığı tek başına kapatan en küçük derslik (best-fit), yoksa en büyüğü
+        closing = [r for r in candidates if r['capacity'] >= gap]
+        if closing:
+            room = min(closing, key=lambda r: r['capacity'])
+        else:
+            room = max(candidates, key=lambda r: r['capacity'])
+        chosen.append(room)
+        chosen_ids.add(room['id'])
+        current_cap += room['capacity']
+        frontier |= set(proximity.get(room['id'], ())) & free_by_id.keys()
+
+    # Gereksiz kalan derslikleri at (kapasite ve bağlılık korunursa)
+    for room in sorted(chosen[1:], key=lambda r: r['capacity']):
+        if current_cap - room['capacity'] < required_cap: continue
+        rest = [r for r in chosen if r['id'] != room['id']]
+        if _is_connected(rest, proximity):
+            chosen = rest
+            current_cap -= room['capacity']
+    return chosen
+
+def _free_components(free_by_id, proximity):
+    """Boş dersliklerin yakınlık grafındaki bağlı bileşenleri: id -> bileşen toplam kapasitesi"""
+    component_cap = {}
+    for start in free_by_id:
+        if start in component_cap: continue
+        members = [start]
+        seen = {start}
+        stack = [start]
+        while stack:
+            for n in proximity.get(stack.pop(), ()):
+                if n in free_by_id and n not in seen:
+                    seen.add(n)
+                    members.append(n)
+                    stack.append(n)
+        total = sum(free_by_id[i]['capacity'] for i in members)
+        for i in members:
+            component_cap[i] = total
+    return component_cap
+
+def find_rooms(free_rooms, required_cap, proximity):
+    """
+    Derslik paketleme: önce tek derslikte best-fit, olmazsa yakınlık grafında
+    bağlı bir derslik kümesi. Önce derslik sayısı, sonra boş koltuk en aza indirilir.
+    """
+    # A) Tek sınıf yetiyor mu? (Yetenler içinde en küçüğü)
+    best_single = None
+    for room in free_rooms:
+        if room['capacity'] >= required_cap and (best_single is None or room['capacity'] < best_single['capacity']):
+            best_single = room
+    if best_single:
+        return [best_single]
+
+    # B) Yetmiyorsa: Yakın dersliklerden küme oluştur (Ek Sınıf)
+    free_by_id = {r['id']: r for r in free_rooms}
+    component_cap = _free_components(free_by_id, proximity)
+
+    best = None
+    best_key = None
+    for seed in free_rooms:
+        # Bileşenin toplam boş kapasitesi yetmiyorsa bu seed'i hiç deneme
+        if component_cap[seed['id']] < required_cap: continue
+        cluster = _grow_cluster(seed, free_by_id, required_cap, proximity)
+        if not cluster: continue
+        key = (len(cluster), sum(r['capacity'] for r in cluster) - required_cap)
+        if best_key is None or key < best_key:
+            best, best_key = cluster, key
+    return best or []
+
+def candidate_room_sets(all_rooms, required_cap, proximity, limit=8):
+    """Bir grup için (tüm derslikler boşken) en iyi `limit` derslik kümesi seçeneği"""
+    singles = sorted([r for r in all_rooms if r['capacity'] >= required_cap], key=lambda r: r['capacity'])
+    options = [[r] for r in singles[:limit]]
+    if len(options) >= limit:
+        return options
+
+    free_by_id = {r['id']: r for r in all_rooms}
+    component_cap = _free_components(free_by_id, proximity)
+    seen = set()
+    clusters = []
+    for seed in all_rooms:
+        if seed['capacity'] >= required_cap or component_cap[seed['id']] < required_cap: continue
+        cluster = _grow_cluster(seed, free_by_id, required_cap, proximity)
+        if not cluster: continue
+        key = frozenset(r['id'] for r in cluster)
+        if key in seen: continue
+        seen.add(key)
+        clusters.append(cluster)
+    clusters.sort(key=lambda c: (len(c), sum(r['capacity'] for r in c)))
+    return options + clusters[:limit - len(options)]
+
+def random_group_order(groups, seed=None, noise=0.3):
+    """Kalabalıktan aza sıralamayı rastgele bozar (çoklu başlangıç için)"""
+    rng = random.Random(seed)
+    keys = [g['total_count'] * rng.uniform(1 - noise, 1 + noise) for g in groups]
+    return sorted(range(len(groups)), key=lambda i: keys[i], reverse=True)
+
+def plan_greedy(snapshot, order=None, progress=None, fixed=None, conflict_masks=None):
+    """Açgözlü (greedy) yerleştirme - veritabanına dokunmaz, sadece snapshot kullanır
+    order: grupların deneneceği sıra (varsayılan: snapshot sırası, kalabalıktan aza)
+    progress: her gruptan sonra progress(yerleşen, işlenen, toplam) çağrılır
+    fixed: önceden yerleşmiş (dokunulmayacak) yerleşimler; sonuç listesine dahildir
+    conflict_masks: hazır çakışma maskeleri (artımlı planlama yalnız yerleştirilecek gruplar için kurar)
+    """
+    groups = snapshot['groups']
+    all_classrooms = snapshot['classrooms']
+    proximity = snapshot['proximity']
+    calendar = snapshot_calendar(snapshot)
+
+    # Çakışma grafı: planlama başında BİR KEZ kurulur
+    if conflict_masks is None:
+        conflict_masks = build_conflict_masks(snapshot_conflict_graph(snapshot))
+
+    slot_masks = [0] * len(calendar['slots']) # slot -> o slotu kaplayan grupların bit maskesi
+    rooms_index = build_room_index(all_classrooms, proximity) # slot -> boş derslik bitset'i
+    placements = []
+    unscheduled_groups = []
+    checks = conflicts = searches = 0 # Ölçüm: çakışma kontrolü / derslik araması sayısı ve süresi
+    search_seconds = 0.0
+
+    for p in fixed or []:
+        span = covered_slots(calendar, calendar['index'][(p['date'], p['time'])], groups[p['group']]['duration'])
+        placements.append(p)
+        for t in span:
+            slot_masks[t] |= 1 << p['group']
+        occupy(rooms_index, span, p['rooms'])
+
+    for g_idx in (order if order is not None else range(len(groups))):
+        group = groups[g_idx]
+        required_cap = group['total_count']
+        blocked_days_indices = group['blocked_days']
+        
+        is_placed = False
+
+        for t, (day, slot) in enumerate(calendar['slots']):
+            if is_placed: break
+            if day.weekday() in blocked_days_indices: continue # Hoca müsait değilse geç
+
+            # Sınavın kapladığı slotlar (uzun sınav sonraki oturumları da kaplar; gün sonunu aşarsa geç)
+            span = covered_slots(calendar, t, group['duration'])
+            if span is None: continue
+
+            # 1. Çakışma Kontrolü
+            checks += 1
+            if check_conflict(g_idx, span, conflict_masks, slot_masks):
+                conflicts += 1
+                continue
+
+            # 2. Sınıf Bulma: kaplanan slotların hepsinde boş, yeten en küçük derslik; yoksa boş
+            # kapasitesi yeten kümelerdeki derslikler arasından yakın derslik kümesi (best-fit paketleme)
+            search_start = perf_counter()
+            room = smallest_free_room(rooms_index, span, required_cap)
+            if room:
+                assigned_rooms = [room]
+            else:
+                assigned_rooms = find_rooms(free_rooms(rooms_index, span, required_cap), required_cap, proximity)
+            searches += 1
+            search_seconds += perf_counter() - search_start
+
+            # Yerleşti mi?
+            if assigned_rooms:
+                placements.append({'group': g_idx, 'date': day, 'time': slot, 'rooms': assigned_rooms})
+                for s in span:
+                    slot_masks[s] |= 1 << g_idx
+                occupy(rooms_index, span, assigned_rooms)
+                is_placed = True
+
+        if not is_placed:
+            unscheduled_groups.append(group['name'])
+        if progress:
+            progress(len(placements), len(placements) + len(unscheduled_groups), len(groups))
+
+    inc('planlama_cakisma_kontrolu_toplam', conflicts, sonuc='cakisma')
+    inc('planlama_cakisma_kontrolu_toplam', checks - conflicts, sonuc='uygun')
+    inc('planlama_derslik_arama_toplam', searches)
+    observe('planlama_asama_saniye', search_seconds, asama='derslik_arama')
+    return {'placements': placements, 'unscheduled': unscheduled_groups}
+
+def build_exam_rows(snapshot, placement):
+    """Bir grup yerleşimi için (gruptaki her ders adına) ExamSchedule nesneleri üretir"""
+    group = snapshot['groups'][placement['group']]
+    day, slot, rooms = placement['date'], placement['time'], placement['rooms']
+    main_room = rooms[0]
+    extras = ",".join([r['name'] for r in rooms[1:]]) if len(rooms) > 1 else None
+    
+    # GRUPTAKİ HER DERSİ AYNI YERE KAYDET
+    return [
+        ExamSchedule(
+            course_id=course['id'],
+            classroom_id=main_room['id'],
+            teacher_id=course['instructor_id'],
+            exam_date=day,
+            start_time=slot,
+            end_time=(datetime.combine(day, slot) + timedelta(minutes=course['duration'])).time(),
+            additional_classrooms=extras
+        )
+        for course in group['courses']
+    ]
+
+def save_schedule(snapshot, placements):
+    """Eski programı silip yerleşimleri ExamSchedule olarak kaydeder (TEK transaction).
+    Yeni program commit edilene kadar eski program görünür kalır. Kaydedilen ders sayısını döner."""
+    ExamSchedule.query.delete()
+    scheduled_count = 0
+    for p in placements:
+        rows = build_exam_rows(snapshot, p)
+        db.session.add_all(rows)
+        scheduled_count += len(rows)
+    bump_schedule_version()
+    db.session.commit()
+    return scheduled_count
+
+def generate_exam_schedule(engine='greedy', time_limit=30, improve_time=0, runs=16, workers=None, progress=None,
+                           should_stop=None):
+    """Ana Planlama Fonksiyonu - GRUPLU VE ORTAK SINAV DESTEKLİ
+    engine: 'greedy' (varsayılan), 'cpsat' (OR-Tools kısıt çözücü, time_limit saniye)
+            veya 'multistart' (runs adet rastgele sıralama, workers süreçte paralel)
+    workers: multistart süreç sayısı / CP-SAT işçi sayısı (varsayılan: çekirdek sayısı)
+    improve_time: > 0 ise sonuç bu kadar saniye yerel arama ile iyileştirilir
+    progress: ilerleme callback'i; PlanlamaIptal fırlatırsa planlama iptal edilir
+    should_stop: iptal sorgusu (CP-SAT ve multistart aramayı bununla keser)
+    """
     results = {'success': False, 'scheduled': 0, 'error': None}
     
     try:
-        all_courses = Course.query.filter_by(has_exam=True).all()
-        if not all_courses:
+        # 1. SNAPSHOT: Tüm girdiler birkaç toplu sorguyla belleğe alınır
+        with sql_sayaci() as sql_snapshot, timer('planlama_asama_saniye', asama='snapshot'):
+            snapshot = load_planning_snapshot()
+        if not snapshot['groups']:
             return {'success': False, 'error': 'Planlanacak ders bulunamadı.'}
 
-        # 1. DERSLERİ İSİMLERİNE GÖRE GRUPLA
-        course_groups = {}
-        for c in all_courses:
-            # Boşlukları temizle ve büyük harf yap ki eşleşsin
-            clean_name = c.name.strip().upper()
-            if clean_name not in course_groups:
-                course_groups[clean_name] = []
-            course_groups[clean_name].append(c)
-        
-        # Grupları öğrenci sayısına göre sırala (En kalabalık grup en başa)
-        sorted_groups = []
-        for name, c_list in course_groups.items():
-            total_students = sum(c.student_count for c in c_list)
-            sorted_groups.append({'courses': c_list, 'total_count': total_students, 'name': name})
-        
-        sorted_groups.sort(key=lambda x: x['total_count'], reverse=True)
+        print(f"🚀 Ortak Sınav Planlaması Başlıyor... (motor: {engine})")
 
-        schedule_memory = []
-        busy_rooms = {} 
-        all_classrooms = Classroom.query.filter_by(is_available=True).order_by(Classroom.capacity.desc()).all()
-        
-        scheduled_count = 0
-        unscheduled_groups = []
+        # 2. ARAMA: Veritabanına gidilmez (sql_search == 0 olmalı)
+        with sql_sayaci() as sql_search, timer('planlama_asama_saniye', asama='arama'):
+            if engine == 'cpsat':
+                from planlama_cozucu import plan_cpsat
+                plan = plan_cpsat(snapshot, time_limit=time_limit, workers=workers, should_stop=should_stop)
+                if plan.get('error'):
+                    return {'success': False, 'error': plan['error']}
+                results['solver'] = plan['stats']
+            elif engine == 'multistart':
+                from coklu_baslangic import plan_multi_start
+                plan = plan_multi_start(snapshot, runs=runs, workers=workers, time_limit=time_limit,
+                                        should_stop=should_stop)
+                results['multistart'] = plan['stats']
+            elif engine == 'greedy':
+                plan = plan_greedy(snapshot, progress=progress)
+            else:
+                return {'success': False, 'error': f'Bilinmeyen planlama motoru: {engine}'}
 
-        print("🚀 Ortak Sınav Planlaması Başlıyor...")
+            # İsteğe bağlı iyileştirme (yerel arama)
+            if improve_time and improve_time > 0:
+                from yerel_arama import improve_schedule
+                plan = improve_schedule(snapshot, plan, time_limit=improve_time, progress=progress)
+                results['improvement'] = plan['stats']
 
-        for group in sorted_groups:
-            course_list = group['courses']
-            group_name = group['name']
-            required_cap = group['total_count']
-            
-            # Gruptaki TÜM öğrencileri topla (Çakışma kontrolü için)
-            group_students = get_student_ids_for_course_list(course_list)
-            
-            # Hoca Kısıtlarını Topla
-            blocked_days_indices = set()
-            for c in course_list:
-                if c.instructor_id:
-                    restrictions = InstructorAvailability.query.filter_by(course_id=c.id).all()
-                    for r in restrictions:
-                        blocked_days_indices.add(r.day_of_week)
-            
-            is_placed = False
-
-            for day in SINAV_GUNLERI:
-                if is_placed: break
-                if day.weekday() in blocked_days_indices: continue # Hoca müsait değilse geç
-
-                for slot in SINAV_SAATLERI:
-                    if is_placed: break
-                    
-                    # 1. Çakışma Kontrolü
-                    if check_conflict(group_students, day, slot, schedule_memory):
-                        continue 
-                    
-                    # 2. Sınıf Bulma
-                    occupied_rooms = busy_rooms.get((day, slot), [])
-                    free_rooms = [r for r in all_classrooms if r.id not in occupied_rooms]
-                    
-                    if not free_rooms: continue
-
-                    assigned_rooms = []
-                    
-                    # A) Tek sınıf yetiyor mu?
-                    for room in free_rooms:
-                        if room.capacity >= required_cap:
-                            assigned_rooms = [room]
-                            break
-                    
-                    # B) Yetmiyorsa: Yakınlık algoritması (Ek Sınıf)
-                    if not assigned_rooms:
-                        for main_room in free_rooms:
-                            current_cap = main_room.capacity
-                            temp_assigned = [main_room]
-                            
-                            prox = ClassroomProximity.query.filter(
-                                ((ClassroomProximity.classroom1_id == main_room.id) | 
-                                 (ClassroomProximity.classroom2_id == main_room.id))
-                            ).all()
-                            nearby_ids = {p.classroom1_id if p.classroom2_id == main_room.id else p.classroom2_id for p in prox}
-                            valid_neighbors = [r for r in free_rooms if r.id in nearby_ids and r.id != main_room.id]
-                            
-                            for neighbor in valid_neighbors:
-                                temp_assigned.append(neighbor)
-                                current_cap += neighbor.capacity
-                                if current_cap >= required_cap:
-                                    assigned_rooms = temp_assigned
-                                    break
-                            if assigned_rooms: break 
-                    
-                    # Yerleşti mi?
-                    if assigned_rooms:
-                        main_room = assigned_rooms[0]
-                        extras = ",".join([r.name for r in assigned_rooms[1:]]) if len(assigned_rooms) > 1 else None
-                        
-                        # GRUPTAKİ HER DERSİ AYNI YERE KAYDET
-                        for course in course_list:
-                            exam = ExamSchedule(
-                                course_id=course.id,
-                                classroom_id=main_room.id,
-                                teacher_id=course.instructor_id,
-                                exam_date=day,
-                                start_time=slot,
-                                end_time=(datetime.combine(day, slot) + timedelta(minutes=course.exam_duration)).time(),
-                                additional_classrooms=extras
-                            )
-                            db.session.add(exam)
-                            scheduled_count += 1
-                        
-                        schedule_memory.append({'date': day, 'time': slot, 'students': group_students})
-                        
-                        if (day, slot) not in busy_rooms: busy_rooms[(day, slot)] = []
-                        for r in assigned_rooms:
-                            busy_rooms[(day, slot)].append(r.id)
-                            
-                        is_placed = True
-
-            if not is_placed:
-                unscheduled_groups.append(group_name)
-
-        db.session.commit()
-        
+        # 3. KAYIT
+        with sql_sayaci() as sql_save, timer('planlama_asama_saniye', asama='kayit'):
+            scheduled_count = save_schedule(snapshot, plan['placements'])
+
+        unscheduled_groups = plan['unscheduled']
         results['success'] = True
         results['scheduled'] = scheduled_count
+        # Kalite: yerleşen/yerleşemeyen grup ve yumuşak kısıt maliyeti (yerel arama ağırlıklarıyla)
+        from yerel_arama import schedule_cost
+        results['groups'] = {'total': len(snapshot['groups']), 'placed': len(plan['placements']),
+                             'unscheduled': len(unscheduled_groups)}
+        results['cost'] = schedule_cost(snapshot, plan['placements'])
+        results['sql'] = {
+            'snapshot': sql_snapshot['count'],
+            'search': sql_search['count'],
+            'save': sql_save['count'],
+            'total': sql_snapshot['count'] + sql_search['count'] + sql_save['count'],
+        }
+        print(f"📊 SQL ifadesi: {results['sql']}")
+        for phase, label in (('snapshot', 'snapshot'), ('search', 'arama'), ('save', 'kayit')):
+            inc('planlama_sql_toplam', results['sql'][phase], asama=label)
+        inc('planlama_toplam', motor=engine, sonuc='basarili')
         if unscheduled_groups:
             results['error'] = f"Yerleşemeyen: {len(unscheduled_groups)} grup."
             
         return results
 
+    except PlanlamaIptal:
+        db.session.rollback()
+        inc('planlama_toplam', motor=engine, sonuc='iptal')
+        return {'success': False, 'cancelled': True, 'error': 'Planlama iptal edildi.'}
     except Exception as e:
         print(f"HATA: {e}")
         db.session.rollback()
+        inc('planlama_toplam', motor=engine, sonuc='hata')
         return {'success': False, 'error': str(e)}
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""
+Kısıt çözücü tabanlı planlama motoru (OR-Tools CP-SAT)
+Greedy ile aynı snapshot üzerinde çalışır. Model yalnızca zamanlamayı çözer:
+her grup için birkaç aday slot (greedy'nin slotu + komşularının en az kapladığı
+slotlar), çakışan gruplar ortak aday slotlarda birlikte olamaz, slot başına toplam
+öğrenci boş koltuk kapasitesini aşamaz. Derslikler çözümden sonra greedy ile aynı
+best-fit paketlemeyle (derslik dizini) atanır; paketlenemeyen gruplar greedy ile
+kalan slotlara yerleştirilir. Greedy sonucu tam ipucu (hint) olarak verilir; sonuç
+greedy'den kötüyse greedy planı döner ve stats['fallback'] bunu gösterir.
+"""
+import os
+import threading
+import time as _time
+from planlama_algoritmasi import plan_greedy, snapshot_conflict_graph, find_rooms, PlanlamaIptal
+from derslik_indeksi import build_room_index, occupy, smallest_free_room, free_rooms
+from sinav_takvimi import snapshot_calendar, covered_slots
+
+# Amaç fonksiyonu: yerleşen grup başına ödül (kalabalık gruplar biraz daha değerli)
+GRUP_ODULU = 1000
+# Çözüm sürerken iptal isteği bu aralıkla (saniye) kontrol edilir
+IPTAL_ARALIGI = 0.5
+
+def _candidate_slots(g_idx, group, calendar, conflict_graph, greedy_slot, slot_groups, limit):
+    """Grubun aday slotları: greedy'nin slotu + greedy planında komşularının en az kapladığı slotlar"""
+    scored = []
+    T = len(calendar['slots'])
+    for t, (day, _) in enumerate(calendar['slots']):
+        if day.weekday() in group['blocked_days']: continue
+        span = covered_slots(calendar, t, group['duration'])
+        if span is None: continue
+        load = sum(conflict_graph[g_idx].get(h, 0) for c in span for h in slot_groups[c])
+        # Eşitlikte gruplar farklı slotlardan başlasın (aynı boş slota yığılmasın)
+        scored.append((t != greedy_slot, load, (t - g_idx * 7) % T, t, span))
+    scored.sort()
+    return [(t, span) for _, _, _, t, span in scored[:limit]]
+
+def _pack_rooms(snapshot, calendar, chosen):
+    """Seçilen slotlara derslik atar (kalabalıktan aza, best-fit); paketlenemeyen grupları ayrıca döner"""
+    groups = snapshot['groups']
+    rooms_index = build_room_index(snapshot['classrooms'], snapshot['proximity'])
+    placements, failed = [], []
+    for g_idx in sorted(chosen, key=lambda g: groups[g]['total_count'], reverse=True):
+        t, span = chosen[g_idx]
+        need = groups[g_idx]['total_count']
+        room = smallest_free_room(rooms_index, span, need)
+        rooms = [room] if room else find_rooms(free_rooms(rooms_index, span, need), need, snapshot['proximity'])
+        if not rooms:
+            failed.append(g_idx)
+            continue
+        occupy(rooms_index, span, rooms)
+        day, slot = calendar['slots'][t]
+        placements.append({'group': g_idx, 'date': day, 'time': slot, 'rooms': rooms})
+    return placements, failed
+
+def plan_cpsat(snapshot, time_limit=30, slot_options=8, workers=None, should_stop=None):
+    """
+    Gruplar x aday slotlar üzerinde CP-SAT modeli kurar ve çözer, ardından derslikleri paketler.
+    slot_options: grup başına aday slot sayısı, workers: çözücü işçi sayısı (varsayılan: çekirdek sayısı).
+    should_stop: True dönerse arama durdurulur ve PlanlamaIptal fırlatılır.
+    Dönen yapı plan_greedy ile aynıdır; ek olarak 'stats' (durum, süre, greedy kıyası, fallback) içerir.
+    """
+    try:
+        from ortools.sat.python import cp_model
+    except ImportError:
+        return {'error': "CP-SAT motoru için OR-Tools gerekli (pip install ortools)."}
+    from yerel_arama import schedule_cost
+
+    groups = snapshot['groups']
+    all_rooms = snapshot['classrooms']
+    proximity = snapshot['proximity']
+    calendar = snapshot_calendar(snapshot)
+    conflict_graph = snapshot_conflict_graph(snapshot)
+    workers = max(1, int(workers or os.cpu_count() or 1))
+
+    # Aynı snapshot üzerinde greedy: hem kıyas hem başlangıç ipucu
+    t0 = _time.perf_counter()
+    greedy = plan_greedy(snapshot)
+    greedy_time = _time.perf_counter() - t0
+    greedy_slot = {p['group']: calendar['index'][(p['date'], p['time'])] for p in greedy['placements']}
+    slot_groups = [[] for _ in calendar['slots']] # slot -> greedy planında o slotu kaplayan gruplar
+    for g_idx, t in greedy_slot.items():
+        for c in covered_slots(calendar, t, groups[g_idx]['duration']):
+            slot_groups[c].append(g_idx)
+
+    t0 = _time.perf_counter()
+    model = cp_model.CpModel()
+    x = {} # x[(g, t)] = grup g slot t'de başlıyor mu
+    cover = {} # (g, c) -> grup g'nin c slotunu kaplayan x değişkenleri (uzun sınavlar sonraki slotları da kaplar)
+    covered = [set() for _ in groups] # g -> aday slotlarının kapladığı slotlar
+    seats = {} # c -> [(öğrenci sayısı, x)]
+    spans = {}
+    objective = []
+    largest_cluster = max(build_room_index(all_rooms, proximity)['cluster_caps'], default=0)
+    for g_idx, group in enumerate(groups):
+        # En büyük yakınlık kümesine bile sığmayan grup modele girmez
+        if group['total_count'] > largest_cluster: continue
+        g_vars = []
+        for t, span in _candidate_slots(g_idx, group, calendar, conflict_graph, greedy_slot.get(g_idx),
+                                        slot_groups, slot_options):
+            var = model.NewBoolVar(f"x_{g_idx}_{t}")
+            x[(g_idx, t)] = var
+            spans[(g_idx, t)] = span
+            g_vars.append(var)
+            for c in span:
+                cover.setdefault((g_idx, c), []).append(var)
+                covered[g_idx].add(c)
+                seats.setdefault(c, []).append((group['total_count'], var))
+        if g_vars:
+            # 1. Her grup en fazla bir kez yerleşir
+            model.AddAtMostOne(g_vars)
+            objective.append((GRUP_ODULU + group['total_count']) * sum(g_vars))
+
+    # 2. Slot başına öğrenci sayısı toplam koltuk kapasitesini aşamaz (derslikler çözümden sonra paketlenir)
+    total_capacity = sum(r['capacity'] for r in all_rooms)
+    for items in seats.values():
+        if sum(n for n, _ in items) > total_capacity:
+            model.Add(sum(n * var for n, var in items) <= total_capacity)
+
+    # 3. Ortak öğrencisi olan gruplar ortak aday slotlarda birlikte olamaz
+    for g_idx, neighbours in enumerate(conflict_graph):
+        for h_idx in neighbours:
+            if h_idx <= g_idx: continue
+            for c in covered[g_idx] & covered[h_idx]:
+                model.AddAtMostOne(cover[(g_idx, c)] + cover[(h_idx, c)])
+
+    model.Maximize(sum(objective))
+
+    # Greedy çözümü tam ipucu olarak ver (her x değişkeni)
+    for (g_idx, t), var in x.items():
+        model.AddHint(var, 1 if greedy_slot.get(g_idx) == t else 0)
+    build_time = _time.perf_counter() - t0
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = float(time_limit)
+    solver.parameters.num_workers = workers
+    solver.parameters.repair_hint = True
+    finished = threading.Event()
+    if should_stop:
+        # Yeni çözüm gelmese de iptal süre sınırını beklemez: izleyici aramayı durdurur
+        def watch():
+            while not finished.wait(IPTAL_ARALIGI):
+                if should_stop():
+                    solver.StopSearch()
+                    return
+        threading.Thread(target=watch, name='cpsat-iptal', daemon=True).start()
+    try:
+        status = solver.Solve(model)
+    finally:
+        finished.set()
+    if should_stop and should_stop():
+        raise PlanlamaIptal()
+
+    stats = {
+        'status': solver.StatusName(status),
+        'build_time': round(build_time, 3),
+        'solve_time': round(solver.WallTime(), 3),
+        'workers': workers,
+        'variables': len(x),
+        'constraints': len(model.Proto().constraints),
+        'greedy_time': round(greedy_time, 3),
+        'greedy_placed': len(greedy['placements']),
+        'fallback': None,
+    }
+
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        # Çözücü süre içinde çözüm bulamadı: greedy planı kullanılır
+        stats.update(objective=None, placed=len(greedy['placements']), fallback='greedy')
+        print(f"🧩 CP-SAT: {stats}")
+        greedy['stats'] = stats
+        return greedy
+
+    # Derslik paketleme; sığmayanlar greedy ile (paketlenenler sabit) diğer slotlara
+    chosen = {g_idx: (t, spans[(g_idx, t)]) for (g_idx, t), var in x.items() if solver.Value(var)}
+    packed, failed = _pack_rooms(snapshot, calendar, chosen)
+    rest = [g for g in range(len(groups)) if g not in chosen] + failed
+    rest.sort(key=lambda g: groups[g]['total_count'], reverse=True)
+    plan = plan_greedy(snapshot, order=rest, fixed=packed)
+    plan['placements'].sort(key=lambda p: (p['date'], p['time']))
+
+    stats['objective'] = int(solver.ObjectiveValue())
+    stats['best_bound'] = int(solver.BestObjectiveBound())
+    stats['repacked'] = len(failed)
+    stats['cpsat_placed'] = len(plan['placements'])
+    stats['cpsat_cost'] = schedule_cost(snapshot, plan['placements'])
+    stats['greedy_cost'] = schedule_cost(snapshot, greedy['placements'])
+    # Önce yerleşen grup sayısı (çok), sonra yumuşak kısıt maliyeti (az): greedy daha iyiyse o döner
+    if (-len(plan['placements']), stats['cpsat_cost']) > (-len(greedy['placements']), stats['greedy_cost']):
+        stats['fallback'] = 'greedy'
+        plan = greedy
+    stats['placed'] = len(plan['placements'])
+    print(f"🧩 CP-SAT: {stats}")
+    plan['stats'] = stats
+    return plan
@@ -0,0 +1,171 @@
+"""
+Arka plan planlama işleri (job queue)
+/planning/auto isteği planlamayı beklemeden bir iş kaydı (PlanningJob) açar ve
+iş kimliğini döner. İşler süreç içindeki tek bir işçi thread'i tarafından
+sırayla çalıştırılır; ilerleme ve iptal isteği iş tablosu üzerinden paylaşılır.
+Çok işçili sunucuda her süreç kendi kuyruğunu işler: bir iş tabloda atomik
+olarak 'running' yapılarak sahiplenilir, böylece iki süreç aynı işi çalıştırmaz.
+"""
+import json
+import queue
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from modeller import db, PlanningJob
+
+# İlerleme tabloya en fazla bu aralıkla (saniye) yazılır
+ILERLEME_ARALIGI = 1.0
+# Bu kadar saniyedir nabız yazmayan 'running' iş sahipsiz (süreci ölmüş) sayılır
+SAHIPSIZ_IS_SURESI = 30
+
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+_boot_attempted = False
+
+def submit_planning_job(app, params, user_id=None):
+    """Yeni planlama işi oluşturur, kuyruğa ekler ve iş kimliğini döner"""
+    job = PlanningJob(status='pending', params=json.dumps(params), created_by=user_id)
+    db.session.add(job)
+    db.session.commit()
+    ensure_worker(app)
+    _queue.put(job.id)
+    return job.id
+
+def cancel_planning_job(job_id):
+    """İptal isteği bırakır; bekleyen iş hemen, çalışan iş bir sonraki kontrolde durur"""
+    job = db.session.get(PlanningJob, job_id)
+    if not job or job.status not in ('pending', 'running'):
+        return False
+    job.cancel_requested = True
+    db.session.commit()
+    return True
+
+def job_status(job):
+    """İş kaydını JSON'a uygun sözlüğe çevirir"""
+    return {
+        'id': job.id,
+        'status': job.status,
+        'placed': job.placed or 0,
+        'processed': job.processed or 0,
+        'total': job.total or 0,
+        'cancel_requested': bool(job.cancel_requested),
+        'result': json.loads(job.result) if job.result else None,
+        'error': job.error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+def ensure_worker(app):
+    """İşçi thread'ini (yoksa) başlatır; önceki süreçten bekleyen işler kuyruğa alınır"""
+    global _worker
+    with _worker_lock:
+        if _worker is not None and _worker.is_alive():
+            return
+        # Süreci ölmüş (nabzı kesilmiş) işleri kapat, bekleyenleri kuyruğa al
+        stale = datetime.now() - timedelta(seconds=SAHIPSIZ_IS_SURESI)
+        for job in PlanningJob.query.filter_by(status='running').all():
+            if (job.heartbeat_at or job.started_at or stale) > stale: continue # Başka bir süreçte çalışıyor
+            job.status = 'failed'
+            job.error = 'Sunucu yeniden başlatıldı.'
+            job.finished_at = datetime.now()
+        db.session.commit()
+        for (job_id,) in db.session.query(PlanningJob.id).filter_by(status='pending').order_by(PlanningJob.id).all():
+            _queue.put(job_id)
+        _worker = threading.Thread(target=_worker_loop, args=(app,), name='planlama-isci', daemon=True)
+        _worker.start()
+
+def start_worker_on_boot(app):
+    """
+    Süreç başına bir kez işçiyi başlatmayı dener (önceki süreçten bekleyen işler alınır).
+    Hata (ör. göçleri uygulanmamış veritabanı) yalnız yazdırılır; istek düşmez, tekrar denenmez:
+    yeni iş gönderildiğinde işçi yine de başlar.
+    """
+    global _boot_attempted
+    if _boot_attempted: return
+    _boot_attempted = True
+    try:
+        ensure_worker(app)
+    except Exception as e:
+        db.session.rollback()
+        print(f"HATA (planlama işçisi başlatılamadı): {e}")
+
+def _worker_loop(app):
+    while True:
+        job_id = _queue.get()
+        try:
+            with app.app_context():
+                _run_job(job_id)
+        except Exception as e:
+            print(f"HATA (planlama işi {job_id}): {e}")
+        finally:
+            _queue.task_done()
+
+def _run_job(job_id):
+    from planlama_algoritmasi import generate_exam_schedule, PlanlamaIptal
+
+    # Atomik sahiplenme: yalnız hâlâ 'pending' olan iş alınır (iptal istenmişse kapatılır)
+    now = datetime.now()
+    pending = db.session.query(PlanningJob).filter_by(id=job_id, status='pending')
+    if pending.filter_by(cancel_requested=True).update({'status': 'cancelled', 'finished_at': now}):
+        db.session.commit()
+        return
+    claimed = pending.update({'status': 'running', 'started_at': now, 'heartbeat_at': now})
+    db.session.commit()
+    if not claimed:
+        return
+    job = db.session.get(PlanningJob, job_id)
+    params = json.loads(job.params or '{}')
+
+    # Arama thread'i veritabanına dokunmaz: ilerleme bellekte tutulur,
+    # ayrı bir izleme thread'i tabloya yazar ve iptal isteğini okur.
+    state = {'placed': 0, 'processed': 0, 'total': 0, 'cancel': False}
+    finished = threading.Event()
+    app = current_app._get_current_object()
+
+    def progress(placed, processed, total):
+        state['placed'], state['processed'], state['total'] = placed, processed, total
+        if state['cancel']:
+            raise PlanlamaIptal()
+
+    def monitor():
+        with app.app_context():
+            while not finished.wait(ILERLEME_ARALIGI):
+                row = db.session.get(PlanningJob, job_id)
+                row.placed, row.processed, row.total = state['placed'], state['processed'], state['total']
+                row.heartbeat_at = datetime.now()
+                if row.cancel_requested:
+                    state['cancel'] = True
+                db.session.commit()
+            db.session.remove()
+
+    watcher = threading.Thread(target=monitor, name=f'planlama-izleyici-{job_id}', daemon=True)
+    watcher.start()
+    try:
+        result = generate_exam_schedule(
+            engine=params.get('engine', 'greedy'),
+            time_limit=params.get('time_limit', 30),
+            improve_time=params.get('improve_time', 0),
+            runs=params.get('runs', 16),
+            workers=params.get('workers'),
+            progress=progress,
+            should_stop=lambda: state['cancel'],
+        )
+    finally:
+        finished.set()
+        watcher.join()
+
+    job = db.session.get(PlanningJob, job_id)
+    db.session.refresh(job)
+    job.placed, job.processed, job.total = state['placed'], state['processed'], state['total']
+    job.result = json.dumps(result, default=str)
+    if result.get('cancelled'):
+        job.status = 'cancelled'
+    elif result.get('success'):
+        job.status = 'done'
+    else:
+        job.status = 'failed'
+        job.error = (result.get('error') or '')[:500]
+    job.finished_at = datetime.now()
+    db.session.commit()
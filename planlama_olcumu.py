@@ -0,0 +1,270 @@
+"""
+Planlama ölçümü: sentetik üniversite ölçeğinde veriyle generate_exam_schedule
+Her ölçek (öğrenci sayısı) için ayrı bir süreçte geçici SQLite veritabanı kurulur,
+sentetik veri modeller üzerinden yüklenir ve planlama çalıştırılır. Süre, tepe
+bellek (RSS), SQL ifadesi sayısı, yerleşen/yerleşemeyen grup ve yumuşak kısıt
+maliyeti raporlanır; sonuçlar zaman içinde kıyaslanabilsin diye JSON'a yazılır.
+Ardından tek ders değişikliği (hocanın sınav gününü kapatması) için artımlı yeniden
+planlama süresi ölçülür (hedef: tam planlamadan çok daha kısa, 1 sn'nin altında).
+
+Sentetik veri:
+  - ders sayısı ~ öğrenci/25, bölüm başına ~40 ders
+  - öğrenci derslerinin ~%85'i kendi kohortundan (bölümün bir sınıfı, ~10 ders), kalanı
+    bölüm seçmelisi ya da az sayıda üniversite geneli seçmeli (seyrek, gerçekçi çakışma grafı)
+  - derslerin bir kısmı ortak isimli (ortak sınav grupları)
+  - derslikler 6-10'luk binalarda, bina içinde yakınlık zinciri
+  - derslerin ~%20'sinde hocanın 1-2 kapalı günü
+  - derslerin ~%2'sinde özel süre (3-4 saat: sonraki oturumları da kaplar)
+Kaydedilen program gerçek zaman aralıklarıyla doğrulanır (öğrenci/derslik çakışması,
+bitiş saati = başlangıç + süre); ihlaller 'check' altında raporlanır.
+
+Kullanım: python planlama_olcumu.py [--scales 1000,5000,20000,50000] [--engine greedy] [--out planlama_olcumu.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, time as dtime
+
+def generate_dataset(students, seed=0, per_student=6, joint_ratio=0.1, blocked_ratio=0.2, special_ratio=0.02):
+    """Sentetik veriyi modeller üzerinden toplu olarak yükler, satır sayılarını döner"""
+    from sqlalchemy import insert
+    from modeller import db, User, Faculty, Department, Course, CourseStudent, Classroom, ClassroomProximity, InstructorAvailability
+
+    rng = random.Random(seed)
+    n_courses = max(20, students // 25)
+    n_depts = max(1, n_courses // 40)
+    n_teachers = max(4, n_courses // 4)
+    n_rooms = max(10, n_courses // 5)
+
+    db.session.execute(insert(Faculty), [{'name': 'Sentetik Fakülte', 'code': 'SNT'}])
+    db.session.execute(insert(Department), [{'name': f'Bölüm {d}', 'code': f'B{d}', 'faculty_id': 1} for d in range(n_depts)])
+    db.session.execute(insert(User), [
+        {'username': f'hoca{i}', 'email': f'hoca{i}@x', 'password_hash': '-', 'role': 'teacher', 'name': f'Hoca {i}'}
+        for i in range(n_teachers)])
+
+    # Dersler: bölümlere eşit dağıtılır; bir kısmı başka bölümden bir dersle aynı adı taşır (ortak sınav)
+    dept_of = [c % n_depts for c in range(n_courses)]
+    names = [f'DERS {c}' for c in range(n_courses)]
+    for c in rng.sample(range(n_courses), int(n_courses * joint_ratio)):
+        names[c] = names[rng.randrange(n_courses)]
+
+    # Kohort: bölümün bir sınıfı (yıl), ~10 ders; öğrenci derslerini çoğunlukla kendi kohortundan alır
+    cohorts, by_dept = {}, {}
+    for c in range(n_courses):
+        cohorts.setdefault((dept_of[c], c // n_depts // 10), []).append(c)
+        by_dept.setdefault(dept_of[c], []).append(c)
+    cohorts = list(cohorts.values())
+    enrol = [[] for _ in range(n_courses)]
+    for s in range(students):
+        own = cohorts[s % len(cohorts)]
+        picked = set()
+        while len(picked) < per_student:
+            roll = rng.random()
+            pool = own if roll < 0.85 else by_dept[dept_of[own[0]]] if roll < 0.98 else range(n_courses)
+            picked.add(rng.choice(pool))
+        for c in picked:
+            enrol[c].append(s)
+
+    special = set(rng.sample(range(n_courses), int(n_courses * special_ratio)))
+    db.session.execute(insert(Course), [
+        {'code': f'SNT{c:05d}', 'name': names[c], 'department_id': 1 + dept_of[c], 'instructor_id': 1 + rng.randrange(n_teachers),
+         'exam_duration': 60, 'special_duration': rng.choice([3, 4]) if c in special else None,
+         'has_exam': True, 'student_count': len(enrol[c])}
+        for c in range(n_courses)])
+    rows = [{'course_id': c + 1, 'student_no': f'{2000000000 + s}', 'student_name': f'Ogrenci {s}'}
+            for c in range(n_courses) for s in enrol[c]]
+    for i in range(0, len(rows), 50000):
+        db.session.execute(insert(CourseStudent), rows[i:i + 50000])
+
+    # Derslikler: binalar (6-10 derslik) ve bina içi yakınlık zinciri + birkaç kısa yol
+    db.session.execute(insert(Classroom), [
+        {'name': f'S{r:04d}', 'capacity': rng.choice([30, 40, 40, 60, 60, 80, 120, 200]), 'is_available': True}
+        for r in range(n_rooms)])
+    pairs, r = [], 1
+    while r <= n_rooms:
+        building = list(range(r, min(r + rng.randint(6, 10), n_rooms + 1)))
+        pairs += [(a, b) for a, b in zip(building, building[1:])]
+        pairs += [(rng.choice(building), rng.choice(building)) for _ in range(len(building) // 3)]
+        r = building[-1] + 1
+    db.session.execute(insert(ClassroomProximity), [{'classroom1_id': a, 'classroom2_id': b} for a, b in pairs if a != b])
+
+    blocked = [{'course_id': c + 1, 'day_of_week': d, 'start_time': dtime(9, 0), 'end_time': dtime(18, 0)}
+               for c in rng.sample(range(n_courses), int(n_courses * blocked_ratio))
+               for d in rng.sample(range(5), rng.randint(1, 2))]
+    if blocked:
+        db.session.execute(insert(InstructorAvailability), blocked)
+    db.session.commit()
+    return {'students': students, 'courses': n_courses, 'enrolments': len(rows), 'departments': n_depts,
+            'classrooms': n_rooms, 'proximities': len(pairs), 'blocked_rows': len(blocked), 'special_duration': len(special)}
+
+def _rss_mb():
+    # Linux'ta ru_maxrss KB cinsindendir
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def check_schedule():
+    """Kaydedilen programı gerçek zaman aralıklarıyla doğrular, ihlal sayılarını döner"""
+    from modeller import db, Course, CourseStudent, ExamSchedule, Classroom
+    from sinav_takvimi import exam_minutes, load_periods
+    courses = {c_id: (name.strip().upper(), exam_minutes(d, s))
+               for c_id, name, d, s in db.session.query(Course.id, Course.name, Course.exam_duration, Course.special_duration)}
+    period_end = {(d, s): e for d, s, e in load_periods()}
+    room_names = dict(db.session.query(Classroom.id, Classroom.name))
+    rows = db.session.query(ExamSchedule.course_id, ExamSchedule.exam_date, ExamSchedule.start_time, ExamSchedule.end_time,
+                            ExamSchedule.classroom_id, ExamSchedule.additional_classrooms).all()
+    report = {'rows': len(rows), 'wrong_end_time': 0, 'multi_period': 0, 'student_overlaps': 0, 'room_overlaps': 0}
+    exams = {} # ders -> (başlangıç, bitiş, ortak sınav grubu)
+    by_room = {}
+    for course_id, day, start, end, room_id, extras in rows:
+        group, minutes = courses[course_id]
+        a = datetime.combine(day, start)
+        b = a + timedelta(minutes=minutes)
+        report['wrong_end_time'] += b.time() != end
+        report['multi_period'] += (day, start) in period_end and end > period_end[(day, start)]
+        exams[course_id] = (a, b, group)
+        # Ek derslikler adla tutulur: ana derslik de adla anahtarlanır (aynı derslik tek anahtar)
+        for room in [room_names[room_id]] + [n.strip() for n in (extras or '').split(',') if n.strip()]:
+            by_room.setdefault(room, []).append(exams[course_id])
+    by_student = {}
+    for course_id, student_no in db.session.query(CourseStudent.course_id, CourseStudent.student_no):
+        if course_id in exams:
+            by_student.setdefault(student_no, []).append(exams[course_id])
+
+    # Aynı ortak sınav grubunun dersleri aynı derslik/öğrenciyi paylaşabilir; farklı gruplar kesişemez.
+    # Başlangıca göre taranır; her aralık, henüz bitmemiş (yalnız komşu değil) tüm aralıklarla karşılaştırılır.
+    for key, index in (('room_overlaps', by_room), ('student_overlaps', by_student)):
+        for items in index.values():
+            items.sort()
+            active = []
+            for a, b, g in items:
+                active = [item for item in active if item[1] > a]
+                report[key] += sum(1 for _, _, g2 in active if g2 != g)
+                active.append((a, b, g))
+    return report
+
+def measure_replan():
+    """Programdaki ilk dersin hocası sınav gününü kapatır; artımlı yeniden planlama ölçülür"""
+    from modeller import db, ExamSchedule, InstructorAvailability
+    from artimli_planlama import replan_incremental
+    exam = ExamSchedule.query.order_by(ExamSchedule.id).first()
+    if exam is None: return None
+    db.session.add(InstructorAvailability(course_id=exam.course_id, day_of_week=exam.exam_date.weekday(),
+                                          start_time=dtime(0, 0), end_time=dtime(23, 59)))
+    db.session.commit()
+    t0 = time.perf_counter()
+    result = replan_incremental(course_ids=[exam.course_id])
+    return {'seconds': round(time.perf_counter() - t0, 3), 'success': result.get('success'), 'sql': result.get('sql'),
+            'affected_groups': result.get('affected_groups'), 'kept_groups': result.get('kept_groups')}
+
+def run_scale(students, args, queue):
+    """Tek ölçek (ayrı süreçte): veri üret, planla, artımlı yeniden planla, ölç"""
+    from flask import Flask
+    from modeller import db
+    from planlama_algoritmasi import generate_exam_schedule
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp, 'planlama.db')}"
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            t0 = time.perf_counter()
+            data = generate_dataset(students, seed=args.seed, per_student=args.per_student)
+            generate_seconds = round(time.perf_counter() - t0, 2)
+            rss_before = _rss_mb()
+
+            if args.tracemalloc: tracemalloc.start()
+            t0 = time.perf_counter()
+            result = generate_exam_schedule(engine=args.engine, time_limit=args.time_limit, improve_time=args.improve_time)
+            plan_seconds = round(time.perf_counter() - t0, 3)
+            heap_peak = round(tracemalloc.get_traced_memory()[1] / 2**20, 1) if args.tracemalloc else None
+            if args.tracemalloc: tracemalloc.stop()
+            check = check_schedule() if result.get('success') else None
+            replan = measure_replan() if result.get('success') else None
+            db.session.remove()
+            db.engine.dispose()
+
+    queue.put({
+        'data': data,
+        'generate_seconds': generate_seconds,
+        'plan_seconds': plan_seconds,
+        'rss_before_plan_mb': rss_before,
+        'peak_rss_mb': _rss_mb(),
+        'heap_peak_mb': heap_peak,
+        'success': result.get('success'),
+        'error': result.get('error'),
+        'scheduled_courses': result.get('scheduled'),
+        'groups': result.get('groups'),
+        'cost': result.get('cost'),
+        'sql': result.get('sql'),
+        'solver': result.get('solver') or result.get('multistart'),
+        'improvement': result.get('improvement'),
+        'check': check,
+        'replan': replan,
+    })
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description='Sentetik veriyle planlama ölçümü')
+    parser.add_argument('--scales', default='1000,5000,20000,50000', help='virgülle ayrılmış öğrenci sayıları')
+    parser.add_argument('--per-student', type=int, default=6, help='öğrenci başına ders')
+    parser.add_argument('--engine', default='greedy', choices=['greedy', 'cpsat', 'multistart'])
+    parser.add_argument('--time-limit', type=float, default=30)
+    parser.add_argument('--improve-time', type=float, default=0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tracemalloc', action='store_true', help='planlama adımının Python yığın tepesini de ölç (yavaşlatır)')
+    parser.add_argument('--out', default='planlama_olcumu.json')
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    runs = []
+    for students in [int(s) for s in args.scales.split(',') if s.strip()]:
+        print(f"🧪 {students} öğrenci: veri üretiliyor ve planlanıyor... ({args.engine})")
+        queue = ctx.Queue()
+        proc = ctx.Process(target=run_scale, args=(students, args, queue))
+        proc.start()
+        res = queue.get()
+        proc.join()
+        runs.append(res)
+        g = res['groups'] or {}
+        print(f"   ⏱ {res['plan_seconds']} sn | RSS {res['peak_rss_mb']} MB | SQL {res['sql'] and res['sql']['total']} | "
+              f"grup {g.get('placed')}/{g.get('total')} | maliyet {res['cost']} | "
+              f"artımlı {res['replan'] and res['replan']['seconds']} sn")
+        check = res['check'] or {}
+        if any(check.get(k) for k in ('wrong_end_time', 'student_overlaps', 'room_overlaps')):
+            print(f"   ❌ Program doğrulaması: {check}")
+
+    print(f"\n{'öğrenci':>8}{'ders':>7}{'kayıt':>9}{'süre sn':>9}{'RSS MB':>8}{'SQL':>6}{'yerleşen':>10}{'yerleşmeyen':>13}{'maliyet':>12}{'artımlı sn':>12}")
+    for r in runs:
+        g = r['groups'] or {}
+        print(f"{r['data']['students']:>8}{r['data']['courses']:>7}{r['data']['enrolments']:>9}{r['plan_seconds']:>9}"
+              f"{r['peak_rss_mb']:>8}{(r['sql'] or {}).get('total', '-'):>6}{g.get('placed', '-'):>10}{g.get('unscheduled', '-'):>13}"
+              f"{r['cost'] if r['cost'] is not None else '-':>12}{(r['replan'] or {}).get('seconds', '-'):>12}")
+
+    with open(args.out, 'w', encoding='utf-8') as fh:
+        json.dump({
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'machine': {'platform': platform.platform(), 'cpus': os.cpu_count()},
+            'params': {k: v for k, v in vars(args).items() if k != 'out'},
+            'runs': runs,
+        }, fh, ensure_ascii=False, indent=2)
+    print(f"💾 Sonuç: {args.out}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+Planlama öncesi veri anlık görüntüsü (snapshot)
+Arama başlamadan önce tüm girdiler birkaç toplu sorguyla belleğe alınır,
+böylece planlama sırasında veritabanına hiç gidilmez.
+"""
+import threading
+from contextlib import contextmanager
+from sqlalchemy import event, select
+from modeller import db, Course, Classroom, CourseStudent, ClassroomProximity, InstructorAvailability
+from sinav_takvimi import build_calendar, load_periods, exam_minutes
+
+# int.bit_count Python 3.10+ ile geldi; eski sürümler için yedek
+if hasattr(int, 'bit_count'):
+    popcount = int.bit_count
+else:
+    def popcount(x): return bin(x).count('1')
+
+@contextmanager
+def sql_sayaci():
+    """Blok içinde (yalnızca bu thread'de) çalıştırılan SQL ifadelerini sayar:
+    with sql_sayaci() as sayac: ... sayac['count']"""
+    counter = {'count': 0}
+    owner = threading.get_ident()
+
+    def _say(conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == owner:
+            counter['count'] += 1
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _say)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', _say)
+
+def students_to_bits(student_ids, student_total):
+    """Yoğun tamsayı ID listesini bitset'e (Python int, bit i = öğrenci i) çevirir"""
+    buf = bytearray((student_total >> 3) + 1)
+    for i in student_ids:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, 'little')
+
+def load_planning_snapshot():
+    """
+    Dersler, kayıtlar, hoca kısıtları, derslikler ve yakınlıkları toplu sorgularla okur.
+    Dönen yapı yalnızca düz Python nesneleri içerir (ORM nesnesi yok).
+    """
+    # 1. Dersler
+    course_rows = db.session.query(
+        Course.id, Course.code, Course.name, Course.instructor_id,
+        Course.exam_duration, Course.special_duration, Course.student_count
+    ).filter(Course.has_exam == True).all()
+
+    courses = {}
+    for row in course_rows:
+        courses[row.id] = {
+            'id': row.id,
+            'code': row.code,
+            'name': row.name,
+            'instructor_id': row.instructor_id,
+            'exam_duration': row.exam_duration or 60,
+            'duration': exam_minutes(row.exam_duration, row.special_duration), # Özel süre (saat) varsa o geçerli
+            'student_count': row.student_count or 0,
+        }
+
+    # 2. Kayıtlar (tek sorgu)
+    # Öğrenci numaraları (String) 0..N-1 yoğun tamsayılara dönüştürülür (interning)
+    student_index = {}
+    enrolments = {c_id: [] for c_id in courses}
+    # En büyük sorgu: ORM satır işleme katmanı atlanır (bağlantı üzerinden düz Core sorgusu)
+    enrol_rows = db.session.connection().execute(
+        select(CourseStudent.course_id, CourseStudent.student_no)
+        .join(Course, Course.id == CourseStudent.course_id)
+        .where(Course.has_exam == True)
+    ).all()
+    for course_id, student_no in enrol_rows:
+        s_id = student_index.get(student_no)
+        if s_id is None:
+            s_id = student_index[student_no] = len(student_index)
+        enrolments[course_id].append(s_id)
+    del enrol_rows
+
+    # 3. Hoca kısıtları (kapalı günler)
+    blocked_days = {}
+    for course_id, day_idx in db.session.query(InstructorAvailability.course_id, InstructorAvailability.day_of_week).all():
+        blocked_days.setdefault(course_id, set()).add(day_idx)
+
+    # 4. Derslikler (büyükten küçüğe)
+    classrooms = [
+        {'id': r.id, 'name': r.name, 'capacity': r.capacity}
+        for r in db.session.query(Classroom.id, Classroom.name, Classroom.capacity)
+            .filter(Classroom.is_available == True)
+            .order_by(Classroom.capacity.desc()).all()
+    ]
+
+    # 5. Yakınlık komşuluk listesi (iki yönlü)
+    proximity = {r['id']: set() for r in classrooms}
+    for c1, c2 in db.session.query(ClassroomProximity.classroom1_id, ClassroomProximity.classroom2_id).all():
+        if c1 in proximity and c2 in proximity and c1 != c2:
+            proximity[c1].add(c2)
+            proximity[c2].add(c1)
+
+    # DERSLERİ İSİMLERİNE GÖRE GRUPLA (Ortak sınav)
+    course_groups = {}
+    for c in courses.values():
+        # Boşlukları temizle ve büyük harf yap ki eşleşsin
+        clean_name = c['name'].strip().upper()
+        course_groups.setdefault(clean_name, []).append(c)
+
+    student_total = len(student_index)
+    groups = []
+    for name, c_list in course_groups.items():
+        group_ids = []
+        group_blocked = set()
+        for c in c_list:
+            group_ids.extend(enrolments[c['id']])
+            if c['instructor_id']:
+                group_blocked |= blocked_days.get(c['id'], set())
+        groups.append({
+            'name': name,
+            'courses': c_list,
+            'total_count': sum(c['student_count'] for c in c_list),
+            'student_bits': students_to_bits(group_ids, student_total),
+            'blocked_days': group_blocked,
+            'duration': max(c['duration'] for c in c_list), # Ortak sınav en uzun dersin süresince sürer
+        })
+
+    # Grupları öğrenci sayısına göre sırala (En kalabalık grup en başa)
+    groups.sort(key=lambda x: x['total_count'], reverse=True)
+
+    return {
+        'groups': groups,
+        'student_index': student_index,
+        'classrooms': classrooms,
+        'proximity': proximity,
+        'calendar': build_calendar(load_periods()), # Etkin dönemin oturumları
+    }
@@ -0,0 +1,178 @@
+"""
+Program görünümü önbelleği
+Gruplanmış sınav programı, program sürümü (ScheduleVersion) başına bir kez
+ilişkiler eager-load edilerek üretilir ve bellekte tutulur. Programı değiştiren
+her işlem (planlama, artımlı planlama, kayıt farkı) aynı transaction içinde
+bump_schedule_version() çağırır; eski sürümün önbelleği kendiliğinden düşer.
+Aynı anda öğrenci -> sınav listesi indeksi (student_timetables) güncellenir, böylece
+öğrenci görünümü tek bir birincil anahtar aramasıdır. Tam planlama indeksi baştan
+üretir; artımlı planlama ve kayıt farkı yalnız değişen derslerin öğrencilerini yeniler.
+"""
+import json
+import threading
+from collections import defaultdict
+from datetime import datetime, date, time
+from sqlalchemy import insert, delete
+from sqlalchemy.orm import joinedload
+from modeller import db, ExamSchedule, ScheduleVersion, CourseStudent, StudentTimetable
+
+_lock = threading.Lock()
+_cache = {'version': None, 'rows': [], 'views': {}}
+# IN (...) listelerinin parça boyu (SQLite değişken sınırının altında)
+IN_PARCA = 500
+
+def _chunks(items, size=IN_PARCA):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def bump_schedule_version(course_ids=None, student_nos=()):
+    """
+    Program sürümünü artırır (commit çağırana aittir) ve yeni sürümü döner.
+    course_ids None ise öğrenci indeksi baştan üretilir; verilirse yalnız bu derslere kayıtlı
+    öğrencilerin (ve kaydı silinen student_nos öğrencilerinin) satırları yenilenir.
+    """
+    row = db.session.get(ScheduleVersion, 1)
+    if row is None:
+        row = ScheduleVersion(id=1, version=0)
+        db.session.add(row)
+    row.version = (row.version or 0) + 1
+    row.updated_at = datetime.now().replace(microsecond=0) # HTTP tarihleri saniye hassasiyetinde
+    if course_ids is None:
+        rebuild_student_timetables(row.version)
+    else:
+        refresh_student_timetables(row.version, course_ids, student_nos)
+    return row.version
+
+def schedule_version():
+    """(sürüm, son değişiklik zamanı); henüz program kaydedilmediyse (0, None). Salt okunur:
+    sürüm tablosundan önce kaydedilmiş programların sürümü göçte (005_program_surumu) üretilir."""
+    row = db.session.get(ScheduleVersion, 1)
+    return (row.version, row.updated_at) if row else (0, None)
+
+def _load_rows(course_ids=None):
+    """Program satırları (course_ids verilirse yalnız o dersler) tek sorguda (course, classroom, teacher
+    birlikte) düz sözlüklere çevrilir"""
+    query = ExamSchedule.query.options(
+        joinedload(ExamSchedule.course), joinedload(ExamSchedule.classroom), joinedload(ExamSchedule.teacher)
+    )
+    if course_ids is None:
+        schedules = query.all()
+    else:
+        schedules = [sch for chunk in _chunks(course_ids) for sch in query.filter(ExamSchedule.course_id.in_(chunk))]
+    rows = []
+    for sch in schedules:
+        # Veri bütünlüğü kontrolü
+        if not sch.course or not sch.classroom: continue
+        rows.append({
+            'course_id': sch.course_id,
+            'teacher_id': sch.teacher_id,
+            'date': sch.exam_date,
+            'time': sch.start_time,
+            'classroom': {'id': sch.classroom.id, 'name': sch.classroom.name},
+            'additional_classrooms': sch.additional_classrooms,
+            'teacher': {'id': sch.teacher.id, 'name': sch.teacher.name} if sch.teacher else None,
+            'course': {'id': sch.course.id, 'code': sch.course.code, 'name': sch.course.name},
+        })
+    return rows
+
+def group_schedules(rows):
+    """GRUPLAMA MANTIĞI: Aynı Tarih, Saat ve Sınıftakileri Birleştir (tarih/saate göre sıralı)"""
+    grouped_schedules = {}
+    for row in rows:
+        key = (row['date'], row['time'], row['classroom']['id'])
+        course = row['course']
+        if key not in grouped_schedules:
+            grouped_schedules[key] = {
+                'date': row['date'],
+                'time': row['time'],
+                'classroom': row['classroom'],
+                'additional_classrooms': row['additional_classrooms'],
+                'teacher': row['teacher'],
+                'courses': [course],
+                'course_codes_str': course['code'],
+                'course_name': course['name'],
+            }
+        else:
+            item = grouped_schedules[key]
+            if course not in item['courses']:
+                item['courses'].append(course)
+            # Kodları yan yana ekle (BLM101, SEC130 gibi)
+            if course['code'] not in item['course_codes_str']:
+                item['course_codes_str'] += f", {course['code']}"
+    final_list = list(grouped_schedules.values())
+    final_list.sort(key=lambda x: (x['date'], x['time']))
+    return final_list
+
+def grouped_program(version, view_key='all', row_filter=None):
+    """
+    Sürüm için gruplanmış programı önbellekten döner.
+    view_key: görünüm anahtarı (ör. ('teacher', id)); row_filter: satır süzgeci (None = tüm program).
+    """
+    with _lock:
+        if _cache['version'] != version:
+            _cache['version'] = version
+            _cache['rows'] = _load_rows()
+            _cache['views'] = {}
+        views = _cache['views']
+        if view_key not in views:
+            rows = _cache['rows'] if row_filter is None else [r for r in _cache['rows'] if row_filter(r)]
+            views[view_key] = group_schedules(rows)
+        return views[view_key]
+
+def rebuild_student_timetables(version):
+    """Öğrenci -> gruplanmış sınav listesi indeksini baştan üretir (commit çağırana aittir)"""
+    rows_by_course = defaultdict(list)
+    for row in _load_rows():
+        rows_by_course[row['course_id']].append(row)
+    student_rows = defaultdict(list)
+    if rows_by_course:
+        for s_no, course_id in (db.session.query(CourseStudent.student_no, CourseStudent.course_id)
+                                .filter(CourseStudent.course_id.in_(list(rows_by_course)))):
+            student_rows[s_no].extend(rows_by_course[course_id])
+
+    db.session.execute(delete(StudentTimetable))
+    return _write_timetables(version, student_rows)
+
+def _write_timetables(version, student_rows):
+    entries = [{'student_no': s_no, 'version': version, 'exams': json.dumps(group_schedules(rows), default=str)}
+               for s_no, rows in student_rows.items() if rows]
+    if entries:
+        db.session.execute(insert(StudentTimetable), entries)
+    return len(entries)
+
+def refresh_student_timetables(version, course_ids, student_nos=()):
+    """Yalnız verilen derslere kayıtlı öğrencilerin ve student_nos öğrencilerinin indeks satırlarını
+    yeniden üretir (commit çağırana aittir), yazılan satır sayısını döner"""
+    students = set(student_nos)
+    for chunk in _chunks(course_ids):
+        students.update(s_no for (s_no,) in db.session.query(CourseStudent.student_no)
+                        .filter(CourseStudent.course_id.in_(chunk)))
+    if not students:
+        return 0
+
+    # Bu öğrencilerin tüm dersleri (değişmeyen derslerdeki sınavları da listede kalır)
+    student_courses = defaultdict(list)
+    for chunk in _chunks(students):
+        for s_no, course_id in (db.session.query(CourseStudent.student_no, CourseStudent.course_id)
+                                .filter(CourseStudent.student_no.in_(chunk))):
+            student_courses[s_no].append(course_id)
+    rows_by_course = defaultdict(list)
+    for row in _load_rows({c for courses in student_courses.values() for c in courses}):
+        rows_by_course[row['course_id']].append(row)
+    student_rows = {s_no: [row for c in student_courses.get(s_no, ()) for row in rows_by_course[c]] for s_no in students}
+
+    for chunk in _chunks(students):
+        db.session.execute(delete(StudentTimetable).where(StudentTimetable.student_no.in_(chunk)))
+    return _write_timetables(version, student_rows)
+
+def student_timetable(student_no):
+    """Öğrencinin gruplanmış sınav listesi (tek indeksli arama); programda sınavı yoksa boş liste"""
+    row = db.session.get(StudentTimetable, student_no)
+    if row is None:
+        return []
+    exams = json.loads(row.exams)
+    for item in exams:
+        item['date'] = date.fromisoformat(item['date'])
+        item['time'] = time.fromisoformat(item['time'])
+    return exams
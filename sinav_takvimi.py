@@ -0,0 +1,117 @@
+"""
+Sınav takvimi: dönem bazlı oturumlar ve zaman aralığı dizini
+Oturumlar (gün, başlangıç, bitiş) exam_periods tablosunda dönem başına tutulur. Etkin
+dönem SINAV_DONEMI ortam değişkeniyle seçilir (yoksa en son tarihli dönem); tabloda
+oturum yoksa varsayılan takvim (VARSAYILAN_GUNLER x VARSAYILAN_SAATLER) kullanılır.
+
+Süre modeli: sınav [başlangıç, başlangıç + süre) aralığını kaplar. Oturumlar birbiriyle
+çakışmaz ve sınavlar yalnız oturum başlangıcında başlar; bu yüzden iki sınavın çakışması
+kapladıkları oturumların kesişmesine denktir. Uzun sınav sonraki oturumları da kaplar,
+öğrenci ve derslik kontrolleri kaplanan her oturumda yapılır. Kaplanan oturumlar günün
+başlangıç listesinde ikili aramayla (O(log n)) bulunur ve (slot, süre) başına saklanır.
+"""
+import os
+from bisect import bisect_left
+from datetime import date, time, datetime, timedelta
+from dotenv import load_dotenv
+from sqlalchemy import insert
+from modeller import db, ExamPeriod
+
+VARSAYILAN_DONEM = '2025-2026 Güz'
+VARSAYILAN_GUNLER = [
+    date(2026, 1, 5), date(2026, 1, 6), date(2026, 1, 7),
+    date(2026, 1, 8), date(2026, 1, 9),
+    date(2026, 1, 12), date(2026, 1, 13), date(2026, 1, 14),
+    date(2026, 1, 15), date(2026, 1, 16)
+]
+VARSAYILAN_SAATLER = [time(9, 0), time(11, 0), time(13, 0), time(15, 0), time(17, 0)]
+VARSAYILAN_OTURUM_SURESI = 120 # dk
+
+def default_periods():
+    """Varsayılan takvim: [(gün, başlangıç, bitiş)]"""
+    return [(d, s, (datetime.combine(d, s) + timedelta(minutes=VARSAYILAN_OTURUM_SURESI)).time())
+            for d in VARSAYILAN_GUNLER for s in VARSAYILAN_SAATLER]
+
+def active_term():
+    load_dotenv()
+    term = os.environ.get('SINAV_DONEMI')
+    if term: return term
+    row = db.session.query(ExamPeriod.term).order_by(ExamPeriod.exam_date.desc()).first()
+    return row[0] if row else VARSAYILAN_DONEM
+
+def load_periods(term=None):
+    """Dönemin oturumları [(gün, başlangıç, bitiş)], tarih/saat sırasıyla; dönemde oturum yoksa varsayılan takvim"""
+    rows = (db.session.query(ExamPeriod.exam_date, ExamPeriod.start_time, ExamPeriod.end_time)
+            .filter_by(term=term or active_term())
+            .order_by(ExamPeriod.exam_date, ExamPeriod.start_time).all())
+    return [tuple(r) for r in rows] or default_periods()
+
+def exam_minutes(exam_duration, special_duration=None):
+    """Sınav süresi (dk): özel süre (saat) girilmişse o, yoksa exam_duration (varsayılan 60)"""
+    return special_duration * 60 if special_duration else (exam_duration or 60)
+
+def _minutes(t):
+    return t.hour * 60 + t.minute
+
+def validate_periods(periods):
+    """Bitiş başlangıçtan sonra olmalı, aynı gündeki oturumlar çakışmamalı (ValueError)"""
+    last = {}
+    for d, start, end in sorted(periods):
+        if end <= start:
+            raise ValueError(f"{d} {start:%H:%M}: bitiş saati başlangıçtan sonra olmalı.")
+        if d in last and start < last[d]:
+            raise ValueError(f"{d} {start:%H:%M}: oturum bir önceki oturumla çakışıyor.")
+        last[d] = end
+
+def replace_periods(term, periods):
+    """Dönemin oturumlarını verilenlerle değiştirir (commit çağırana ait), eklenen oturum sayısını döner"""
+    validate_periods(periods)
+    db.session.query(ExamPeriod).filter_by(term=term).delete(synchronize_session=False)
+    rows = [{'term': term, 'exam_date': d, 'start_time': s, 'end_time': e} for d, s, e in sorted(periods)]
+    if rows:
+        db.session.execute(insert(ExamPeriod), rows)
+    return len(rows)
+
+def build_calendar(periods):
+    """
+    Oturumlardan takvim dizini. slot = oturum sırası (tarih, saat):
+    'slots': slot -> (gün, saat), 'index': (gün, saat) -> slot, 'day_of': slot -> gün sırası,
+    gün başına başlangıç dakikaları (ikili arama), ilk slot ve son bitiş.
+    """
+    calendar = {'slots': [], 'index': {}, 'day_of': [], 'day_starts': [], 'day_first': [], 'day_end': [], 'spans': {}}
+    days = {}
+    for d, start, end in sorted(periods):
+        if d not in days:
+            days[d] = len(days)
+            calendar['day_starts'].append([])
+            calendar['day_first'].append(len(calendar['slots']))
+            calendar['day_end'].append(0)
+        day = days[d]
+        calendar['index'][(d, start)] = len(calendar['slots'])
+        calendar['slots'].append((d, start))
+        calendar['day_of'].append(day)
+        calendar['day_starts'][day].append(_minutes(start))
+        calendar['day_end'][day] = max(calendar['day_end'][day], _minutes(end))
+    return calendar
+
+def covered_slots(calendar, t, duration):
+    """
+    t slotunda başlayan `duration` dakikalık sınavın kapladığı slotlar (t dahil, tuple).
+    Sınav günün son oturumunun bitişini aşıyorsa None.
+    """
+    key = (t, duration)
+    span = calendar['spans'].get(key, False)
+    if span is not False: return span
+    day = calendar['day_of'][t]
+    first = calendar['day_first'][day]
+    starts = calendar['day_starts'][day]
+    end = starts[t - first] + max(duration or 0, 1)
+    span = None if end > calendar['day_end'][day] else tuple(range(t, first + bisect_left(starts, end)))
+    calendar['spans'][key] = span
+    return span
+
+def snapshot_calendar(snapshot):
+    """Snapshot'ın takvimi (snapshot veritabanından gelmediyse varsayılan takvim kurulur)"""
+    if 'calendar' not in snapshot:
+        snapshot['calendar'] = build_calendar(default_periods())
+    return snapshot['calendar']
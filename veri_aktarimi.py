@@ -0,0 +1,209 @@
+"""
+Toplu veri aktarımı (bulk import)
+import_all_data çıktısını veritabanına yazar. Mevcut anahtarlar önce kümelere
+yüklenir, yeni satırlar toplu INSERT (executemany) ile TEK transaction içinde
+eklenir. Varsayılan şifre bir kez hash'lenir ve tüm yeni hesaplarda kullanılır.
+"""
+import random
+import time
+from functools import lru_cache
+import unidecode
+from sqlalchemy import insert, update, delete, func
+from werkzeug.security import generate_password_hash
+from modeller import db, User, Course, CourseStudent, Classroom, ClassroomProximity
+from program_onbellegi import bump_schedule_version
+from olcumleme import observe, inc
+
+VARSAYILAN_SIFRE = '123456'
+HOCALAR = ['Elif Pinar Hacibeyoglu', 'Cuneyt Yazici', 'Vildan Yazici', 'Orkun Karabatak']
+
+@lru_cache(maxsize=1)
+def _default_hash():
+    # Varsayılan şifre yalnız gerektiğinde ve bir kez hash'lenir
+    start = time.perf_counter()
+    password_hash = generate_password_hash(VARSAYILAN_SIFRE)
+    observe('aktarim_asama_saniye', time.perf_counter() - start, asama='sifre_hash')
+    return password_hash
+
+def _bulk_insert(model, rows):
+    if rows:
+        db.session.execute(insert(model), rows)
+    return len(rows)
+
+def _bulk_update(model, rows):
+    # Birincil anahtara göre toplu UPDATE (rows: [{'id': .., alan: ..}])
+    if rows:
+        db.session.execute(update(model), rows)
+    return len(rows)
+
+def import_roster_data(students_data, proximity_data, tum_derslikler, room_capacities, default_dept_id, sync=False):
+    """
+    Ayrıştırılmış verileri toplu olarak kaydeder ve bir rapor döner:
+    {'inserted': {tablo: adet}, 'updated': {...}, 'deleted': {...}, 'diff': {ders kodu: {'added', 'removed'}},
+     'dropped_courses': [ders kodu], 'rows': toplam, 'seconds': .., 'rows_per_sec': ..}
+    sync=True ise (delta aktarım) listelerde artık olmayan öğrencilerin ders kayıtları da silinir; hiç listesi
+    gelmeyen derslerin tüm kayıtları silinir (ders kendisi kalır) ve bu dersler 'dropped_courses' ile raporlanır.
+    """
+    start = time.perf_counter()
+    inserted = {}
+    updated = {}
+    deleted = {}
+    diff = {}
+    dropped = []
+
+    try:
+        # 1. Derslikler
+        rooms = {name: (r_id, cap) for r_id, name, cap in db.session.query(Classroom.id, Classroom.name, Classroom.capacity)}
+        new_rooms, room_updates = [], []
+        for derslik_adi in tum_derslikler:
+            if not derslik_adi or len(derslik_adi) > 20: continue
+            kapasite = room_capacities.get(derslik_adi, 40)
+            if derslik_adi not in rooms:
+                new_rooms.append({'name': derslik_adi, 'capacity': kapasite, 'is_available': True})
+            elif rooms[derslik_adi][1] != kapasite:
+                room_updates.append({'id': rooms[derslik_adi][0], 'capacity': kapasite})
+        inserted['classrooms'] = _bulk_insert(Classroom, new_rooms)
+        updated['classrooms'] = _bulk_update(Classroom, room_updates)
+
+        # 2. Dersler
+        courses = {code: (c_id, name) for c_id, code, name in db.session.query(Course.id, Course.code, Course.name)}
+        new_courses, course_updates = [], []
+        for course_code, data in students_data.items():
+            if not data['students']: continue
+            if course_code not in courses:
+                new_courses.append({
+                    'code': course_code,
+                    'name': data['name'], # MANUEL LİSTEDEN GELEN DOĞRU İSİM
+                    'department_id': default_dept_id,
+                    'exam_duration': 60,
+                    'has_exam': True,
+                })
+            elif courses[course_code][1] != data['name']:
+                course_updates.append({'id': courses[course_code][0], 'name': data['name']}) # İsim güncelle
+        inserted['courses'] = _bulk_insert(Course, new_courses)
+        updated['courses'] = _bulk_update(Course, course_updates)
+        if new_courses:
+            codes = [c['code'] for c in new_courses]
+            for c_id, code in db.session.query(Course.id, Course.code).filter(Course.code.in_(codes)):
+                courses[code] = (c_id, None)
+
+        # 3. Kayıtlar (ders başına küme farkı) ve öğrenci hesapları
+        course_ids = [courses[code][0] for code, data in students_data.items() if data['students']]
+        enrolled = {}
+        for row_id, course_id, s_no in (db.session.query(CourseStudent.id, CourseStudent.course_id, CourseStudent.student_no)
+                                        .filter(CourseStudent.course_id.in_(course_ids))):
+            enrolled.setdefault(course_id, {})[s_no] = row_id
+        usernames = {u for (u,) in db.session.query(User.username)}
+        new_enrolments, new_users, removed_ids = [], [], []
+        removed_students = set()
+        for course_code, data in students_data.items():
+            if not data['students']: continue
+            course_id = courses[course_code][0]
+            current = enrolled.get(course_id, {})
+            listed = set()
+            added = 0
+            for student in data['students']:
+                s_no = student['student_no']
+                listed.add(s_no)
+                if s_no not in current:
+                    current[s_no] = None
+                    new_enrolments.append({'course_id': course_id, 'student_no': s_no, 'student_name': student['name']})
+                    added += 1
+                if s_no not in usernames:
+                    usernames.add(s_no)
+                    new_users.append({
+                        'username': s_no,
+                        'email': f"{s_no}@ogrenci.kostu.edu.tr",
+                        'password_hash': _default_hash(),
+                        'role': 'student',
+                        'name': student['name'] if student['name'] else "Ogrenci",
+                    })
+            removed = [(s_no, row_id) for s_no, row_id in current.items() if s_no not in listed and row_id] if sync else []
+            removed_ids += [row_id for _, row_id in removed]
+            removed_students.update(s_no for s_no, _ in removed)
+            if added or removed:
+                diff[course_code] = {'added': added, 'removed': len(removed)}
+        if sync:
+            # Listesi gelmeyen (ya da öğrencisi kalmayan) mevcut dersler: tüm kayıtları silinir
+            listed_ids = set(course_ids)
+            code_of = {c_id: code for code, (c_id, _) in courses.items()}
+            dropped_ids = [c_id for (c_id,) in db.session.query(CourseStudent.course_id).distinct() if c_id not in listed_ids]
+            removed_by_course = {}
+            if dropped_ids:
+                for row_id, course_id, s_no in (db.session.query(CourseStudent.id, CourseStudent.course_id, CourseStudent.student_no)
+                                                .filter(CourseStudent.course_id.in_(dropped_ids))):
+                    removed_ids.append(row_id)
+                    removed_students.add(s_no)
+                    removed_by_course[course_id] = removed_by_course.get(course_id, 0) + 1
+            for course_id, count in removed_by_course.items():
+                diff[code_of[course_id]] = {'added': 0, 'removed': count}
+            dropped = sorted(code_of[c_id] for c_id in removed_by_course)
+            course_ids += dropped_ids
+        inserted['course_students'] = _bulk_insert(CourseStudent, new_enrolments)
+        inserted['users'] = _bulk_insert(User, new_users)
+        if removed_ids:
+            db.session.execute(delete(CourseStudent).where(CourseStudent.id.in_(removed_ids)))
+        deleted['course_students'] = len(removed_ids)
+
+        # Öğrenci sayısı dosyadan değil, kayıt tablosundan
+        counts = dict(db.session.query(CourseStudent.course_id, func.count(CourseStudent.id))
+                      .filter(CourseStudent.course_id.in_(course_ids)).group_by(CourseStudent.course_id))
+        stale = db.session.query(Course.id, Course.student_count).filter(Course.id.in_(course_ids))
+        updated['student_counts'] = _bulk_update(Course, [{'id': c_id, 'student_count': counts.get(c_id, 0)}
+                                                          for c_id, count in stale if count != counts.get(c_id, 0)])
+
+        # 4. Yakınlıklar
+        room_ids = {name: r_id for r_id, name in db.session.query(Classroom.id, Classroom.name)}
+        pairs = {frozenset(p) for p in db.session.query(ClassroomProximity.classroom1_id, ClassroomProximity.classroom2_id)}
+        new_prox = []
+        for prox in proximity_data:
+            c1, c2 = room_ids.get(prox['classroom1']), room_ids.get(prox['classroom2'])
+            if c1 and c2 and frozenset((c1, c2)) not in pairs:
+                pairs.add(frozenset((c1, c2)))
+                new_prox.append({'classroom1_id': c1, 'classroom2_id': c2})
+        inserted['classroom_proximities'] = _bulk_insert(ClassroomProximity, new_prox)
+
+        # 5. Hoca Hesapları
+        new_teachers = []
+        for t_name in HOCALAR:
+            u_name = unidecode.unidecode(t_name.lower().replace(' ', ''))
+            if u_name not in usernames:
+                usernames.add(u_name)
+                new_teachers.append({'username': u_name, 'email': f'{u_name}@kostu.edu.tr', 'password_hash': _default_hash(),
+                                     'role': 'teacher', 'name': t_name})
+        inserted['teachers'] = _bulk_insert(User, new_teachers)
+
+        # 6. Hocası olmayan derslere rastgele hoca ata
+        teacher_ids = [t_id for (t_id,) in db.session.query(User.id).filter_by(role='teacher')]
+        if teacher_ids:
+            assignments = [{'id': c_id, 'instructor_id': random.choice(teacher_ids)}
+                           for (c_id,) in db.session.query(Course.id).filter(Course.instructor_id.is_(None))]
+            updated['instructors'] = _bulk_update(Course, assignments)
+
+        if diff or course_updates:
+            # Öğrenci görünümleri kayıtlara bağlı: yalnız kaydı/adı değişen derslerin öğrencileri yenilenir
+            changed_ids = {courses[code][0] for code in diff} | {u['id'] for u in course_updates}
+            bump_schedule_version(course_ids=changed_ids, student_nos=removed_students)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    elapsed = time.perf_counter() - start
+    rows = sum(inserted.values()) + sum(updated.values()) + sum(deleted.values())
+    observe('aktarim_asama_saniye', elapsed, asama='veritabani_yazma')
+    for kind, counts in (('ekleme', inserted), ('guncelleme', updated), ('silme', deleted)):
+        for table, count in counts.items():
+            inc('aktarim_satir_toplam', count, tablo=table, islem=kind)
+    report = {
+        'inserted': inserted,
+        'updated': updated,
+        'deleted': deleted,
+        'diff': diff,
+        'dropped_courses': dropped,
+        'rows': rows,
+        'seconds': round(elapsed, 3),
+        'rows_per_sec': int(rows / elapsed) if elapsed else rows,
+    }
+    print(f"💾 Toplu aktarım: {dict(report, diff=f'{len(diff)} ders')}")
+    return report
@@ -0,0 +1,54 @@
+"""
+Veritabanı bağlantı ayarları
+Adres ve havuz ayarları ortam değişkenlerinden (ya da .env dosyasından) okunur:
+  DATABASE_URL          varsayılan sqlite:///sinav_programi.db (instance klasörü)
+  DB_POOL_SIZE          sunucu veritabanı için havuz boyutu (varsayılan 5)
+  DB_MAX_OVERFLOW       havuz taşması (varsayılan 10)
+  DB_POOL_TIMEOUT       bağlantı bekleme süresi, sn (varsayılan 30)
+  DB_POOL_RECYCLE       bağlantı yenileme süresi, sn (varsayılan 1800)
+  SQLITE_WAL            1 ise SQLite WAL kipinde açılır (varsayılan 1)
+  SQLITE_BUSY_TIMEOUT   kilit bekleme süresi, ms (varsayılan 5000)
+SQLite WAL kipinde okuyucular yazıcıyı (içe aktarma, planlama) beklemez.
+"""
+import os
+import sqlite3
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+VARSAYILAN_ADRES = 'sqlite:///sinav_programi.db'
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+def database_config():
+    """Flask-SQLAlchemy ayarları (SQLALCHEMY_DATABASE_URI ve SQLALCHEMY_ENGINE_OPTIONS)"""
+    load_dotenv()
+    url = os.environ.get('DATABASE_URL') or VARSAYILAN_ADRES
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):] # Eski biçimli adresler
+    if url.startswith('sqlite'):
+        # Her bağlantıya pragmalar _sqlite_pragmas ile uygulanır
+        options = {'connect_args': {'timeout': _env_int('SQLITE_BUSY_TIMEOUT', 5000) / 1000}}
+    else:
+        options = {
+            'pool_size': _env_int('DB_POOL_SIZE', 5),
+            'max_overflow': _env_int('DB_MAX_OVERFLOW', 10),
+            'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+            'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+            'pool_pre_ping': True, # Kopmuş bağlantıyı kullanmadan önce yakala
+        }
+    return {'SQLALCHEMY_DATABASE_URI': url, 'SQLALCHEMY_ENGINE_OPTIONS': options}
+
+@event.listens_for(Engine, 'connect')
+def _sqlite_pragmas(dbapi_conn, connection_record):
+    if not isinstance(dbapi_conn, sqlite3.Connection): return
+    cursor = dbapi_conn.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {_env_int('SQLITE_BUSY_TIMEOUT', 5000)}")
+    if _env_int('SQLITE_WAL', 1):
+        cursor.execute("PRAGMA journal_mode = WAL")
+        cursor.execute("PRAGMA synchronous = NORMAL") # WAL'da güvenli, commit başına fsync yok
+    cursor.execute("PRAGMA cache_size = -20000") # ~20 MB sayfa önbelleği
+    cursor.execute("PRAGMA temp_store = MEMORY")
+    cursor.close()
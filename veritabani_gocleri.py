@@ -0,0 +1,101 @@
+"""
+Veritabanı şema göçleri (migration)
+Uygulama açılırken veritabanı SİLİNMEZ: db.create_all() yalnızca eksik tabloları
+ekler, mevcut tablolardaki değişiklikler (indeksler, tekil anahtarlar) sıralı
+GOCLER listesinden uygulanır. Uygulanan göçler schema_migrations tablosunda
+tutulur; her göç bir kez ve kendi transaction'ında çalışır.
+Yeni göç: fonksiyonu yazıp GOCLER'in SONUNA ekleyin (sıra ve adlar değişmez).
+"""
+from sqlalchemy import text, inspect
+from modeller import db, CourseStudent, ExamSchedule, InstructorAvailability, ClassroomProximity, PlanningJob, SchemaMigration, ExamPeriod, ScheduleVersion
+
+# Sık aranan sütunların indekslerini taşıyan tablolar (tanımlar modeller.py içinde)
+INDEKSLI_TABLOLAR = [CourseStudent, ExamSchedule, InstructorAvailability, ClassroomProximity]
+
+def create_declared_indexes(models=INDEKSLI_TABLOLAR):
+    """Modellerde tanımlı ama veritabanında olmayan indeksleri oluşturur, oluşturulan adları döner"""
+    conn = db.session.connection()
+    created = []
+    for model in models:
+        for index in sorted(model.__table__.indexes, key=lambda i: i.name):
+            index.create(conn, checkfirst=True)
+            created.append(index.name)
+    return created
+
+def drop_declared_indexes(models=INDEKSLI_TABLOLAR):
+    """Tanımlı indeksleri kaldırır (yalnız ölçüm betiği 'indekssiz' durumu kurmak için kullanır)"""
+    conn = db.session.connection()
+    for model in models:
+        for index in model.__table__.indexes:
+            index.drop(conn, checkfirst=True)
+
+def add_missing_column(model, column_name):
+    """Modele sonradan eklenen sütunu mevcut tabloya ekler (ALTER TABLE ... ADD COLUMN)"""
+    conn = db.session.connection()
+    table = model.__table__
+    if column_name in {c['name'] for c in inspect(conn).get_columns(table.name)}:
+        return False
+    column = table.columns[column_name]
+    col_type = column.type.compile(dialect=conn.dialect)
+    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+    return True
+
+def _ders_kaydi_tekil():
+    # Tekil anahtar eklenmeden önce mükerrer kayıtları temizle (en eski satır kalır)
+    deleted = db.session.execute(text(
+        "DELETE FROM course_students WHERE id NOT IN "
+        "(SELECT MIN(id) FROM course_students GROUP BY course_id, student_no)"
+    )).rowcount
+    if deleted:
+        print(f"  🧹 {deleted} mükerrer ders kaydı silindi.")
+        db.session.execute(text(
+            "UPDATE courses SET student_count = "
+            "(SELECT COUNT(*) FROM course_students WHERE course_students.course_id = courses.id)"
+        ))
+    create_declared_indexes([CourseStudent])
+
+def _sicak_sutun_indeksleri():
+    create_declared_indexes()
+
+def _is_nabzi():
+    # Çok işçili sunucuda sahipsiz kalan işleri ayırt etmek için
+    add_missing_column(PlanningJob, 'heartbeat_at')
+
+def _sinav_oturumlari():
+    # Sabit kodlu takvim veriye taşındı: tablo boşsa varsayılan dönemin oturumları yazılır
+    from sinav_takvimi import VARSAYILAN_DONEM, default_periods, replace_periods
+    if not db.session.query(ExamPeriod.id).first():
+        replace_periods(VARSAYILAN_DONEM, default_periods())
+
+def _program_surumu():
+    # Sürüm tablosundan önce kaydedilmiş program: sürüm ve öğrenci indeksi bir kez üretilir
+    from program_onbellegi import bump_schedule_version
+    if db.session.get(ScheduleVersion, 1) is None and db.session.query(ExamSchedule.id).first():
+        bump_schedule_version()
+
+# (ad, fonksiyon) - sırası önemlidir
+GOCLER = [
+    ('001_ders_kaydi_tekil', _ders_kaydi_tekil),
+    ('002_sicak_sutun_indeksleri', _sicak_sutun_indeksleri),
+    ('003_is_nabzi', _is_nabzi),
+    ('004_sinav_oturumlari', _sinav_oturumlari),
+    ('005_program_surumu', _program_surumu),
+]
+
+def migrate():
+    """Eksik tabloları oluşturur ve uygulanmamış göçleri sırayla çalıştırır; uygulanan göç adlarını döner"""
+    db.create_all()
+    applied = {m_id for (m_id,) in db.session.query(SchemaMigration.id)}
+    done = []
+    for name, step in GOCLER:
+        if name in applied: continue
+        try:
+            step()
+            db.session.add(SchemaMigration(id=name))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        print(f"🛠️ Göç uygulandı: {name}")
+        done.append(name)
+    return done
@@ -0,0 +1,229 @@
+"""
+Yerel arama ile iyileştirme (Simulated Annealing)
+Greedy / CP-SAT sonucunu alır; taşıma, yer değiştirme ve yerleşemeyen grubu
+ekleme hamleleriyle yumuşak kısıt maliyetini düşürür. Her hamle yalnızca
+etkilenen grubun komşuları üzerinden (artımlı / delta) değerlendirilir.
+"""
+import math
+import random
+import time as _time
+from planlama_algoritmasi import snapshot_conflict_graph, build_conflict_masks, find_rooms
+from derslik_indeksi import build_room_index, occupy, release, is_free, smallest_free_room, free_rooms
+from sinav_takvimi import snapshot_calendar, covered_slots
+
+# Yumuşak kısıt ağırlıkları (ortak öğrenci başına / boş koltuk başına / yerleşmeyen grup başına)
+VARSAYILAN_AGIRLIKLAR = {
+    'same_day': 10,      # Aynı gün iki sınav
+    'consecutive': 30,   # Aynı gün art arda iki sınav
+    'waste': 1,          # Boş koltuk
+    'unplaced': 1000000, # Yerleşemeyen grup
+}
+
+def _setup(snapshot, weights=None):
+    """Maliyet hesabı için ortak yapılar (takvim, komşuluk listeleri, ağırlıklar)"""
+    w = dict(VARSAYILAN_AGIRLIKLAR)
+    w.update(weights or {})
+    calendar = snapshot_calendar(snapshot)
+    graph = snapshot_conflict_graph(snapshot)
+    return w, calendar, graph
+
+def _pair_penalty(t1, n1, t2, n2, day_of, w_day, w_consec):
+    # n1/n2: sınavların kapladığı slot sayısı; biri biter bitmez diğeri başlıyorsa art arda
+    if day_of[t1] != day_of[t2]: return 0
+    return w_consec if t2 == t1 + n1 or t1 == t2 + n2 else w_day
+
+def schedule_cost(snapshot, placements, weights=None):
+    """Bir yerleşimin toplam yumuşak kısıt maliyeti (kıyas için tam hesap)"""
+    w, calendar, graph = _setup(snapshot, weights)
+    groups = snapshot['groups']
+
+    pos = {p['group']: calendar['index'][(p['date'], p['time'])] for p in placements}
+    width = {g: len(covered_slots(calendar, t, groups[g]['duration'])) for g, t in pos.items()}
+    cost = 0
+    for p in placements:
+        g = p['group']
+        cost += w['waste'] * max(sum(r['capacity'] for r in p['rooms']) - groups[g]['total_count'], 0)
+        for h, shared in graph[g].items():
+            if h > g and h in pos:
+                cost += shared * _pair_penalty(pos[g], width[g], pos[h], width[h], calendar['day_of'],
+                                               w['same_day'], w['consecutive'])
+    cost += w['unplaced'] * (len(groups) - len(pos))
+    return cost
+
+def improve_schedule(snapshot, plan, time_limit=5.0, seed=None, weights=None, progress=None):
+    """
+    Simulated annealing ile plan iyileştirme. time_limit saniye boyunca çalışır,
+    bulunan en iyi yerleşimi plan_greedy ile aynı formatta döner ('stats' eklenir).
+    """
+    rng = random.Random(seed)
+    w, calendar, graph = _setup(snapshot, weights)
+    w_day, w_consec, w_waste, w_unplaced = w['same_day'], w['consecutive'], w['waste'], w['unplaced']
+    slots, day_of = calendar['slots'], calendar['day_of']
+
+    groups = snapshot['groups']
+    all_rooms = snapshot['classrooms']
+    proximity = snapshot['proximity']
+    G, T = len(groups), len(slots)
+    if not G: return plan
+
+    masks = build_conflict_masks(graph)
+    neighbours = [list(n.items()) for n in graph]
+    need = [g['total_count'] for g in groups]
+    # span[g][t]: g grubu t slotunda başlarsa kapladığı slotlar (None = gün sonunu aşıyor)
+    span = [[covered_slots(calendar, t, g['duration']) for t in range(T)] for g in groups]
+    allowed = [[t for t in range(T) if span[i][t] and slots[t][0].weekday() not in g['blocked_days']]
+               for i, g in enumerate(groups)]
+    allowed_sets = [set(a) for a in allowed]
+
+    # Durum: grup -> slot (-1 = yerleşmemiş), grup -> derslikler, slot -> grup maskesi, slot dizinli derslik müsaitliği
+    pos = [-1] * G
+    rooms_of = [None] * G
+    slot_mask = [0] * T
+    rooms_index = build_room_index(all_rooms, proximity)
+
+    def waste(g, rooms):
+        return w_waste * max(sum(r['capacity'] for r in rooms) - need[g], 0)
+
+    def group_cost(g, t, skip=-1):
+        # g grubu t slotunda olsaydı komşularıyla ödeyeceği ceza
+        c = 0
+        day = day_of[t]
+        n = len(span[g][t])
+        for h, shared in neighbours[g]:
+            th = pos[h]
+            if th < 0 or h == skip or day_of[th] != day: continue
+            c += shared * (w_consec if th == t + n or t == th + len(span[h][th]) else w_day)
+        return c
+
+    def conflicts(g, t, ignore=0):
+        # Kaplanan slotlardan birinde çakışan grup var mı? (ignore: yok sayılacak grup bitleri)
+        mask = masks[g] & ~ignore
+        return any(mask & slot_mask[s] for s in span[g][t])
+
+    def put(g, t, rooms):
+        pos[g] = t
+        rooms_of[g] = rooms
+        for s in span[g][t]:
+            slot_mask[s] |= 1 << g
+        occupy(rooms_index, span[g][t], rooms)
+
+    def take(g):
+        t = pos[g]
+        for s in span[g][t]:
+            slot_mask[s] &= ~(1 << g)
+        release(rooms_index, span[g][t], rooms_of[g])
+        pos[g] = -1
+        rooms_of[g] = None
+
+    def rooms_for(g, t, current=None):
+        # Mevcut derslikler hedef slotlarda boşsa aynen kullan, değilse yeniden paketle
+        keys = span[g][t]
+        if current and is_free(rooms_index, keys, current):
+            return current
+        room = smallest_free_room(rooms_index, keys, need[g])
+        if room:
+            return [room]
+        return find_rooms(free_rooms(rooms_index, keys, need[g]), need[g], proximity) or None
+
+    for p in plan['placements']:
+        put(p['group'], calendar['index'][(p['date'], p['time'])], p['rooms'])
+
+    cost = schedule_cost(snapshot, plan['placements'], weights)
+    initial_cost = best_cost = cost
+    best_pos, best_rooms = pos[:], rooms_of[:]
+
+    start = _time.perf_counter()
+    deadline = start + time_limit
+    temp0 = max(w_day * 5, 1)
+    temp = temp0
+    moves = accepted = 0
+
+    while True:
+        if moves & 255 == 0:
+            now = _time.perf_counter()
+            if now >= deadline: break
+            if progress and moves & 65535 == 0:
+                progress(sum(1 for t in pos if t >= 0), G, G)
+            # Sıcaklık süreyle doğrusal olarak düşer
+            temp = temp0 * (1 - (now - start) / time_limit) + 1e-6
+        moves += 1
+
+        g = rng.randrange(G)
+        tg = pos[g]
+        r = rng.random()
+
+        if tg < 0:
+            # EKLEME: Yerleşemeyen grubu boş bir yere koymayı dene
+            if not allowed[g]: continue
+            t = rng.choice(allowed[g])
+            if conflicts(g, t): continue
+            rooms = rooms_for(g, t)
+            if not rooms: continue
+            delta = group_cost(g, t) + waste(g, rooms) - w_unplaced
+            if delta <= 0 or rng.random() < math.exp(-delta / temp):
+                put(g, t, rooms)
+                cost += delta
+                accepted += 1
+
+        elif r < 0.6:
+            # TAŞIMA: Grubu başka bir slota al
+            t = rng.choice(allowed[g])
+            if t == tg or conflicts(g, t): continue
+            rooms = rooms_for(g, t, rooms_of[g])
+            if not rooms: continue
+            delta = group_cost(g, t) - group_cost(g, tg) + waste(g, rooms) - waste(g, rooms_of[g])
+            if delta <= 0 or rng.random() < math.exp(-delta / temp):
+                take(g)
+                put(g, t, rooms)
+                cost += delta
+                accepted += 1
+
+        else:
+            # YER DEĞİŞTİRME: İki grubun slot ve dersliklerini takas et
+            h = rng.randrange(G)
+            th = pos[h]
+            if th < 0 or th == tg: continue
+            if th not in allowed_sets[g] or tg not in allowed_sets[h]: continue
+            # Takas yalnız iki grup iki slotta da aynı sayıda slot kaplıyorsa (dolu slot/derslik ayak izi aynen takas edilir)
+            if len(span[g][th]) != len(span[h][th]) or len(span[h][tg]) != len(span[g][tg]): continue
+            if conflicts(g, th, 1 << h) or conflicts(h, tg, 1 << g): continue
+            rooms_g, rooms_h = rooms_of[g], rooms_of[h]
+            if sum(x['capacity'] for x in rooms_h) < need[g] or sum(x['capacity'] for x in rooms_g) < need[h]: continue
+            delta = (group_cost(g, th, h) - group_cost(g, tg, h)
+                     + group_cost(h, tg, g) - group_cost(h, th, g)
+                     + waste(g, rooms_h) + waste(h, rooms_g) - waste(g, rooms_g) - waste(h, rooms_h))
+            if delta <= 0 or rng.random() < math.exp(-delta / temp):
+                take(g)
+                take(h)
+                put(g, th, rooms_h)
+                put(h, tg, rooms_g)
+                cost += delta
+                accepted += 1
+
+        if cost < best_cost:
+            best_cost = cost
+            best_pos, best_rooms = pos[:], rooms_of[:]
+
+    elapsed = _time.perf_counter() - start
+    placements = []
+    for g in range(G):
+        if best_pos[g] >= 0:
+            day, slot = slots[best_pos[g]]
+            placements.append({'group': g, 'date': day, 'time': slot, 'rooms': best_rooms[g]})
+    placements.sort(key=lambda p: (p['date'], p['time']))
+
+    stats = {
+        'moves': moves,
+        'accepted': accepted,
+        'moves_per_sec': int(moves / elapsed) if elapsed else 0,
+        'initial_cost': initial_cost,
+        'final_cost': best_cost,
+        'time': round(elapsed, 3),
+    }
+    print(f"🔧 Yerel arama: {stats}")
+
+    return {
+        'placements': placements,
+        'unscheduled': [grp['name'] for g, grp in enumerate(groups) if best_pos[g] < 0],
+        'stats': stats,
+    }
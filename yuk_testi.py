@@ -0,0 +1,174 @@
+"""
+Yük testi: içe aktarma sürerken eşzamanlı /program okumaları
+Geçici bir veritabanı hazırlar (data/ klasörü içe aktarılır ve planlanır), uygulamayı
+ayrı bir süreçte başlatır; okuyucu thread'ler sürekli /program isterken ayrı bir
+yazıcı süreç büyük bir sentetik içe aktarmayı TEK transaction'da yapar.
+Okuma gecikmeleri (p50/p95/max) ve hatalar, yazıcı yokken ve varken ayrı raporlanır.
+SQLite için her iki kip de denenir: WAL ve klasik (rollback journal).
+
+Kullanım:
+  python yuk_testi.py [--readers 8] [--courses 200] [--per-course 500] [--out yuk_testi.json]
+  DATABASE_URL=postgresql://... python yuk_testi.py --url http://127.0.0.1:8000
+    (çalışan çok işçili sunucuya karşı; örn. gunicorn -w 4 ana:app, şema: flask --app ana migrate)
+"""
+import argparse
+import http.cookiejar
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+def _set_env(env):
+    os.environ.update(env)
+
+def _prepare(env):
+    """Şema + admin + data/ içe aktarma + greedy planlama (ayrı süreçte, ortam ayarlarıyla)"""
+    _set_env(env)
+    from ana import app, ensure_defaults
+    from modeller import db, User
+    from veritabani_gocleri import migrate
+    from excel_ayiklayici import import_all_data
+    from veri_aktarimi import import_roster_data
+    from planlama_algoritmasi import generate_exam_schedule
+    with app.app_context():
+        migrate()
+        if not User.query.filter_by(username='admin').first():
+            admin = User(username='admin', email='admin@kostu.edu.tr', role='admin', name='Sistem Yöneticisi')
+            admin.set_password('admin123')
+            db.session.add(admin)
+            db.session.commit()
+        dept_id = ensure_defaults()
+        students, prox, rooms, caps = import_all_data('data')
+        import_roster_data(students, prox, rooms, caps, dept_id)
+        generate_exam_schedule()
+
+def _serve(env, port):
+    _set_env(env)
+    from ana import app
+    app.run(host='127.0.0.1', port=port, threaded=True, use_reloader=False)
+
+def _write(env, courses, per_course, result):
+    """Büyük sentetik içe aktarma: courses x per_course kayıt, tek transaction"""
+    _set_env(env)
+    from ana import app, ensure_defaults
+    from veri_aktarimi import import_roster_data
+    students_data = {
+        f'YUK{c:04d}': {'name': f'Yük Dersi {c}', 'students': [
+            {'student_no': f'{2900000000 + (c * 7919 + i) % (courses * per_course // 3)}', 'name': f'Yuk Ogrenci {i}'}
+            for i in range(per_course)]}
+        for c in range(courses)}
+    start = time.perf_counter()
+    with app.app_context():
+        report = import_roster_data(students_data, [], set(), {}, ensure_defaults())
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    result['rows'] = report['rows']
+
+def _login(base_url):
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    data = urllib.parse.urlencode({'username': 'admin', 'password': 'admin123'}).encode()
+    opener.open(f'{base_url}/login', data, timeout=30).read()
+    return opener
+
+def _reader(base_url, samples, stop):
+    opener = _login(base_url)
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            with opener.open(f'{base_url}/program', timeout=60) as resp:
+                resp.read()
+                ok = resp.status == 200
+        except Exception:
+            ok = False
+        samples.append((time.time(), time.perf_counter() - start, ok))
+
+def _wait_for(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f'{base_url}/login', timeout=2).read()
+            return
+        except Exception:
+            time.sleep(0.2)
+    raise RuntimeError(f'Sunucu açılmadı: {base_url}')
+
+def _summary(samples):
+    if not samples:
+        return {'requests': 0}
+    lat = sorted(s[1] * 1000 for s in samples)
+    pick = lambda q: round(lat[min(int(q * len(lat)), len(lat) - 1)], 1)
+    return {'requests': len(samples), 'errors': sum(1 for s in samples if not s[2]),
+            'p50_ms': pick(0.5), 'p95_ms': pick(0.95), 'max_ms': round(lat[-1], 1)}
+
+def run_scenario(base_url, env, args, ctx):
+    """Önce yalnız okuma (baseline), sonra okuma + yazıcı süreç"""
+    samples, stop = [], threading.Event()
+    readers = [threading.Thread(target=_reader, args=(base_url, samples, stop), daemon=True) for _ in range(args.readers)]
+    for t in readers: t.start()
+    time.sleep(args.baseline)
+    writer_start = time.time()
+    result = ctx.Manager().dict()
+    writer = ctx.Process(target=_write, args=(env, args.courses, args.per_course, result))
+    writer.start()
+    writer.join()
+    writer_end = time.time()
+    time.sleep(0.5)
+    stop.set()
+    for t in readers: t.join()
+    return {
+        'baseline': _summary([s for s in samples if s[0] < writer_start]),
+        'during_import': _summary([s for s in samples if writer_start <= s[0] <= writer_end]),
+        'import_seconds': result.get('seconds'),
+        'import_rows': result.get('rows'),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='İçe aktarma sırasında eşzamanlı /program okuma testi')
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--courses', type=int, default=200)
+    parser.add_argument('--per-course', type=int, default=500)
+    parser.add_argument('--baseline', type=float, default=3.0, help='yazıcı başlamadan önceki okuma süresi (sn)')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--url', help='çalışan sunucu (verilirse sunucu/veritabanı hazırlanmaz)')
+    parser.add_argument('--out', default='yuk_testi.json')
+    args = parser.parse_args()
+    ctx = multiprocessing.get_context('spawn')
+
+    results = {}
+    if args.url:
+        print(f"🌐 {args.url} test ediliyor...")
+        results['server'] = run_scenario(args.url.rstrip('/'), {}, args, ctx)
+    else:
+        for mode, wal in (('sqlite_wal', '1'), ('sqlite_rollback', '0')):
+            with tempfile.TemporaryDirectory() as tmp:
+                env = {'DATABASE_URL': f"sqlite:///{os.path.join(tmp, 'yuk.db')}", 'SQLITE_WAL': wal}
+                print(f"🧪 {mode}: veritabanı hazırlanıyor...")
+                prep = ctx.Process(target=_prepare, args=(env,))
+                prep.start(); prep.join()
+                server = ctx.Process(target=_serve, args=(env, args.port), daemon=True)
+                server.start()
+                base_url = f'http://127.0.0.1:{args.port}'
+                try:
+                    _wait_for(base_url)
+                    results[mode] = run_scenario(base_url, env, args, ctx)
+                finally:
+                    server.terminate(); server.join()
+
+    print(f"\n{'senaryo':<18}{'aşama':<15}{'istek':>7}{'hata':>6}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}")
+    for mode, res in results.items():
+        for phase in ('baseline', 'during_import'):
+            r = res[phase]
+            print(f"{mode:<18}{phase:<15}{r['requests']:>7}{r.get('errors', 0):>6}"
+                  f"{r.get('p50_ms', 0):>9}{r.get('p95_ms', 0):>9}{r.get('max_ms', 0):>9}")
+        print(f"{'':<18}içe aktarma: {res['import_rows']} satır, {res['import_seconds']} sn")
+
+    with open(args.out, 'w', encoding='utf-8') as fh:
+        json.dump({'params': {k: v for k, v in vars(args).items() if k != 'out'}, 'results': results},
+                  fh, ensure_ascii=False, indent=2)
+    print(f"💾 Sonuç: {args.out}")
+
+if __name__ == '__main__':
+    main()